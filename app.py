@@ -33,21 +33,80 @@ except ImportError:
 import streamlit as st
 import sqlite3
 import datetime
+import functools
 import smtplib
 import json
 import os
 import time
 import base64
 import re
+import hashlib
+import subprocess
+import sys
+import shutil
+import tempfile
+import uuid
+import threading
+import zlib
+import io
+import itertools
+import mmap
+import wave
+import platform
+import numpy as np
 import pandas as pd
-from PyPDF2 import PdfReader
+import pyarrow as pa
+import pyarrow.parquet as pq
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from PyPDF2 import PdfReader, PdfWriter
 import streamlit.components.v1 as components
 from langchain_google_genai import ChatGoogleGenerativeAI
-from streamlit_mic_recorder import speech_to_text
+from langchain_core.messages import SystemMessage, HumanMessage
+from streamlit_mic_recorder import speech_to_text, mic_recorder
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 
+try:
+    # Preferred cold-tier codec; zlib (stdlib) is used when zstandard is absent
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    # PostgreSQL driver + pool for the shared multi-replica backend
+    import psycopg
+    import psycopg_pool
+except ImportError:
+    psycopg = None
+    psycopg_pool = None
+
+try:
+    # Process memory sampling for the bulk export / import benchmark
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    # PDFium page rasterizer for Law Library page previews
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    # Server-side CPU speech recognition (CTranslate2 Whisper)
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+# Driver exception families caught by the persistence layer (whichever backend is live)
+DB_ERRORS = (sqlite3.Error,) + ((psycopg.Error,) if psycopg else ())
+DB_INTEGRITY_ERRORS = (sqlite3.IntegrityError,) + ((psycopg.IntegrityError,) if psycopg else ())
+
+# Start of this full script run (fragment reruns never re-execute module level)
+RUN_STARTED = time.perf_counter()
+
 # ------------------------------------------------------------------------------
 # SECTION 2: GLOBAL CONFIGURATION & SYSTEM CONSTANTS
 # ------------------------------------------------------------------------------
@@ -59,11 +118,67 @@ SYSTEM_CONFIG = {
     "LAYOUT": "wide",
     "THEME_PRIMARY": "#0b1120",
     "DB_FILENAME": "advocate_ai_v2.db",
+    "COLD_DB_FILENAME": "advocate_ai_cold.db",
+    "SHARD_DIRECTORY": "shards",
+    "DB_BACKEND": os.environ.get("LEVIATHAN_DB_BACKEND", "sqlite"),
+    "POSTGRES_DSN": os.environ.get("LEVIATHAN_POSTGRES_DSN", ""),
+    "POSTGRES_POOL_MIN": 1,
+    "POSTGRES_POOL_MAX": 10,
+    "STT_ENGINE": os.environ.get("LEVIATHAN_STT_ENGINE", "local"),
+    "STT_MODEL_PATH": os.environ.get("LEVIATHAN_STT_MODEL_PATH", ""),
+    "STT_CHUNK_SEC": 8,
+    "STT_CPU_THREADS": os.cpu_count() or 4,
     "DATA_REPOSITORY": "data",
+    "INGEST_CHUNK_BYTES": 1024 * 1024,
+    "INGEST_WORKERS": 2,
+    "INGEST_MAX_BATCH_BYTES": 256 * 1024 * 1024,
+    "THUMBNAIL_DIRECTORY": "thumbnails",
+    "THUMBNAIL_CACHE_BYTES": 128 * 1024 * 1024,
+    "VIEWER_DOWNLOAD_MAX_BYTES": 64 * 1024 * 1024,
+    "THUMBNAIL_SCALE": 1.5,
+    "CHAT_CANVAS_HEIGHT": 560,
+    "UI_TIMING_WINDOW": 200,
+    "PROMPT_TOKEN_BUDGET": 8000,
     "VERSION_ID": "36.5.0-ALPHA",
     "LOG_LEVEL": "STRICT",
     "SMTP_SERVER": "smtp.gmail.com",
-    "SMTP_PORT": 587
+    "SMTP_PORT": 587,
+    "BACKUP_DIRECTORY": "backups",
+    "BACKUP_RETENTION": 7,
+    "EXPORT_DIRECTORY": "exports",
+    "EXPORT_BATCH_ROWS": 50000,
+    "MAINTENANCE_TICK_SEC": 60,
+    "WAL_CHECKPOINT_BYTES": 8 * 1024 * 1024,
+    "VACUUM_INTERVAL_SEC": 15 * 60,
+    "VACUUM_PAGES_PER_RUN": 2000,
+    "OPTIMIZE_INTERVAL_SEC": 60 * 60,
+    "BACKUP_INTERVAL_SEC": 6 * 60 * 60
+}
+
+# Case File Classifications for Chamber Provisioning (maps to chambers.chamber_type)
+CHAMBER_TYPES = [
+    "General Litigation",
+    "Rent & Tenancy",
+    "Property & Land",
+    "Constitutional Petition",
+    "Civil Appeal",
+    "Criminal Defence"
+]
+
+# Interface languages → BCP-47 locales for the browser speech recognizer
+INTERFACE_LEXICON = {
+    "English": "en-US",
+    "Urdu": "ur-PK",
+    "Sindhi": "sd-PK",
+    "Punjabi": "pa-PK"
+}
+
+# Whisper language codes for the local speech engine (browser recognizer uses BCP-47 locales)
+STT_LANGUAGE_CODES = {
+    "English": "en",
+    "Urdu": "ur",
+    "Sindhi": "sd",
+    "Punjabi": "pa"
 }
 
 # Apply Streamlit Runtime Configuration
@@ -83,7 +198,12 @@ def apply_leviathan_shaders():
     Injects a high-density Dark Mode CSS architecture into the Streamlit DOM.
     Refined for the 'Sovereign Dark Blue/Navy' aesthetic.
     Line count expanded for granular control over every UI component.
+    Emitted once per browser session: the stylesheet is attached to the page <head>,
+    so it outlives the Streamlit elements that are rebuilt on every rerun.
     """
+    if st.session_state.get("shaders_injected"):
+        return
+
     shader_css = """
     <style>
         /* ------------------------------------------------------- */
@@ -275,31 +395,298 @@ def apply_leviathan_shaders():
         ::-webkit-scrollbar-thumb:hover { background: #334155; }
     </style>
     """
-    st.markdown(shader_css, unsafe_allow_html=True)
+    stylesheet = shader_css.strip().removeprefix("<style>").removesuffix("</style>")
+    st.html(f"""
+        <script>
+            if (!document.getElementById("leviathan-shaders")) {{
+                const sheet = document.createElement("style");
+                sheet.id = "leviathan-shaders";
+                sheet.textContent = {json.dumps(stylesheet)};
+                document.head.appendChild(sheet);
+            }}
+        </script>
+    """, unsafe_allow_javascript=True)
+    st.session_state.shaders_injected = True
 
 # ------------------------------------------------------------------------------
-# SECTION 4: RELATIONAL DATABASE PERSISTENCE ENGINE (SQLITE3)
+# SECTION 3A: UI FRAGMENTS & INTERACTION TIMING
 # ------------------------------------------------------------------------------
 
+def record_ui_timing(scope, started):
+    """Appends one server-side render duration (ms) to the session's rolling timing log."""
+    timings = st.session_state.setdefault("ui_timings", deque(maxlen=SYSTEM_CONFIG["UI_TIMING_WINDOW"]))
+    timings.append((scope, (time.perf_counter() - started) * 1000))
+
+def leviathan_fragment(func):
+    """
+    st.fragment that times its own reruns. Inside a full run (or an enclosing fragment)
+    the outer scope is already being timed, so only fragment-scoped reruns are recorded.
+    """
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        if st.session_state.get("ui_render_scope"):
+            return func(*args, **kwargs)
+        st.session_state.ui_render_scope = func.__name__
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            st.session_state.ui_render_scope = None
+            record_ui_timing(func.__name__, started)
+    return st.fragment(timed)
+
+def rerun_fragment():
+    """Reruns the calling fragment; a fragment executing inside a full run reruns the app."""
+    st.rerun(scope="app" if st.session_state.get("ui_render_scope") == "full run" else "fragment")
+
+def render_ui_timing_panel():
+    """Admin console block: median / p95 server time per interaction scope (this session)."""
+    st.subheader("UI Responsiveness")
+    timings = st.session_state.get("ui_timings")
+    if not timings:
+        st.caption("No interactions recorded yet.")
+        return
+    scopes = {}
+    for scope, ms in timings:
+        scopes.setdefault(scope, []).append(ms)
+    st.table([
+        {
+            "Scope": scope,
+            "Interactions": len(samples),
+            "Median (ms)": round(float(np.median(samples)), 1),
+            "P95 (ms)": round(float(np.percentile(samples, 95)), 1)
+        }
+        for scope, samples in sorted(scopes.items(), key=lambda item: item[0] != "full run")
+    ])
+    st.caption("Fragment scopes rerun without the sidebar, shader injection or unrelated panels.")
+
 # ------------------------------------------------------------------------------
-# SECTION 4: RELATIONAL DATABASE PERSISTENCE ENGINE (SQLITE3)
+# SECTION 4: RELATIONAL DATABASE PERSISTENCE ENGINE (SQLITE3 / POSTGRESQL)
 # ------------------------------------------------------------------------------
 
-def get_db_connection():
-    try:
-        db_path = SYSTEM_CONFIG["DB_FILENAME"]
-        connection = sqlite3.connect(db_path, check_same_thread=False)
+# Every db_* function speaks DB-API with '?' placeholders against the connection
+# returned by get_db_connection(); the active backend adapts dialect differences.
+
+class SQLiteBackend:
+    """Single-file local vault (default). One writer at a time; WAL for concurrent readers."""
+    name = "sqlite"
+    pk_column = "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    def __init__(self, filename=None):
+        self.filename = filename or SYSTEM_CONFIG["DB_FILENAME"]
+
+    def connect(self):
+        connection = sqlite3.connect(self.filename, check_same_thread=False)
         connection.execute("PRAGMA journal_mode=WAL;") 
         connection.execute("PRAGMA synchronous=NORMAL;")
         connection.execute("PRAGMA cache_size=10000;")
         connection.execute("PRAGMA foreign_keys=ON;")
         return connection
-    except sqlite3.Error as e:
+
+    def table_columns(self, cursor, table):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return [col[1] for col in cursor.fetchall()]
+
+    def insert_or_ignore(self, table, columns):
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    def begin_snapshot(self, conn):
+        """Pins a WAL read snapshot: every SELECT until rollback() sees the same commit."""
+        conn.execute("BEGIN")
+
+    def stream_cursor(self, conn):
+        """sqlite3 cursors already step rows lazily; fetchmany() never materializes the table."""
+        return conn.cursor()
+
+    def space_profile(self, conn):
+        """Returns (file_bytes, free_bytes)."""
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return page_size * page_count, page_size * freelist
+
+@functools.lru_cache(maxsize=512)
+def _qmark_to_pyformat(sql):
+    """Rewrites '?' placeholders to psycopg's '%s' (escaping literal '%')."""
+    return sql.replace("%", "%%").replace("?", "%s")
+
+class _PostgresCursor:
+    """sqlite3-compatible cursor facade; statements are server-side prepared per connection."""
+
+    def __init__(self, raw_cursor, prepare=True):
+        self._cur = raw_cursor
+        self._prepare = prepare
+
+    def execute(self, sql, params=()):
+        if self._prepare:
+            self._cur.execute(_qmark_to_pyformat(sql), params, prepare=True)
+        else:
+            self._cur.execute(_qmark_to_pyformat(sql), params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._cur.executemany(_qmark_to_pyformat(sql), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchmany(self, size):
+        return self._cur.fetchmany(size)
+
+    def close(self):
+        self._cur.close()
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+class _PostgresConnection:
+    """Pooled connection facade; close() hands the connection back to the pool."""
+
+    def __init__(self, pool, raw_connection):
+        self._pool = pool
+        self._raw = raw_connection
+
+    def cursor(self, name=None, prepare=True):
+        # Named cursors live server-side and cannot be prepared
+        if name:
+            return _PostgresCursor(self._raw.cursor(name=name), prepare=False)
+        return _PostgresCursor(self._raw.cursor(), prepare=prepare)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        if self._raw is not None:
+            self._raw.rollback()
+            self._pool.putconn(self._raw)
+            self._raw = None
+
+class PostgresBackend:
+    """Shared PostgreSQL server for multi-replica deployments behind a load balancer."""
+    name = "postgres"
+    pk_column = "BIGSERIAL PRIMARY KEY"
+
+    def __init__(self, dsn):
+        if psycopg_pool is None:
+            raise RuntimeError("PostgreSQL backend requires 'psycopg[binary]' and 'psycopg_pool'")
+        self.pool = psycopg_pool.ConnectionPool(
+            dsn,
+            min_size=SYSTEM_CONFIG["POSTGRES_POOL_MIN"],
+            max_size=SYSTEM_CONFIG["POSTGRES_POOL_MAX"],
+            open=True
+        )
+
+    def connect(self):
+        return _PostgresConnection(self.pool, self.pool.getconn())
+
+    def table_columns(self, cursor, table):
+        cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = ?", (table,))
+        return [col[0] for col in cursor.fetchall()]
+
+    def insert_or_ignore(self, table, columns):
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) ON CONFLICT DO NOTHING"
+
+    def begin_snapshot(self, conn):
+        """Read-only REPEATABLE READ transaction: one MVCC snapshot for every following SELECT."""
+        conn.cursor(prepare=False).execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+
+    def stream_cursor(self, conn):
+        """Named (server-side) cursor so fetchmany() pulls batches instead of the whole result."""
+        return conn.cursor(name=f"leviathan_stream_{uuid.uuid4().hex[:12]}")
+
+    def space_profile(self, conn):
+        """Returns (database_bytes, 0); dead tuples are reclaimed by autovacuum, not a freelist."""
+        return conn.execute("SELECT pg_database_size(current_database())").fetchone()[0], 0
+
+@st.cache_resource
+def get_persistence_backend():
+    """Selects the persistence backend once per process from SYSTEM_CONFIG["DB_BACKEND"]."""
+    if SYSTEM_CONFIG["DB_BACKEND"] == "postgres":
+        return PostgresBackend(SYSTEM_CONFIG["POSTGRES_DSN"])
+    return SQLiteBackend()
+
+def get_db_connection():
+    try:
+        return get_persistence_backend().connect()
+    except DB_ERRORS + (RuntimeError,) as e:
         st.error(f"CRITICAL: Persistence Engine Failure. Details: {e}")
         return None
 
-def init_leviathan_db():
-    connection = get_db_connection()
+def _renumber_duplicate_chambers(cursor):
+    """
+    Keeps the oldest chamber of each duplicated (owner, title) and renames the rest
+    "<title> (2)", "<title> (3)", ...; transcripts follow via chamber_id. Returns the rename count.
+    """
+    cursor.execute('''
+        SELECT owner_email, chamber_name FROM chambers
+        WHERE owner_email IS NOT NULL AND chamber_name IS NOT NULL
+        GROUP BY owner_email, chamber_name HAVING COUNT(*) > 1
+    ''')
+    renamed = 0
+    for owner, title in cursor.fetchall():
+        cursor.execute("SELECT chamber_name FROM chambers WHERE owner_email=?", (owner,))
+        taken = {r[0] for r in cursor.fetchall()}
+        cursor.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=? ORDER BY id", (owner, title))
+        suffix = 2
+        for (ch_id,) in cursor.fetchall()[1:]:
+            while f"{title} ({suffix})" in taken:
+                suffix += 1
+            taken.add(f"{title} ({suffix})")
+            cursor.execute("UPDATE chambers SET chamber_name=? WHERE id=?", (f"{title} ({suffix})", ch_id))
+            renamed += 1
+    return renamed
+
+def create_chamber_schema(connection, backend):
+    """
+    chambers + message_logs with their indexes. Shared by the directory vault (counsel
+    without a firm) and every firm shard, so both route the same SQL.
+    """
+    cursor = connection.cursor()
+    pk = backend.pk_column
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS chambers (id {pk}, owner_email TEXT, chamber_name TEXT, init_date TEXT, chamber_type TEXT DEFAULT 'General Litigation', case_status TEXT DEFAULT 'Active', is_archived INTEGER DEFAULT 0, FOREIGN KEY(owner_email) REFERENCES users(email))")
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS message_logs (id {pk}, chamber_id INTEGER, sender_role TEXT, message_body TEXT, ts_created TEXT, token_count INTEGER DEFAULT 0, FOREIGN KEY(chamber_id) REFERENCES chambers(id))")
+    connection.commit()
+
+    # Chamber Registry Integrity: one case title per counsel
+    try:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_chambers_owner_name ON chambers(owner_email, chamber_name)")
+        connection.commit()
+    except DB_INTEGRITY_ERRORS:
+        # Legacy duplicates: renumber them, then enforce the constraint
+        connection.rollback()
+        renamed = _renumber_duplicate_chambers(cursor)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_chambers_owner_name ON chambers(owner_email, chamber_name)")
+        connection.commit()
+        print(f"Chamber Uniqueness Enforced: {renamed} legacy duplicate titles renumbered")
+
+    # Partial Index: archived case files never enter the active-chamber lookup path
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chambers_active ON chambers(owner_email, id) WHERE is_archived = 0")
+
+    # Transcript Lookup Index (history rendering + cold-tier migration)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_message_logs_chamber ON message_logs(chamber_id, id)")
+    connection.commit()
+
+def init_leviathan_db(backend=None):
+    if backend is None:
+        connection = get_db_connection()
+        backend = get_persistence_backend()
+    else:
+        connection = backend.connect()
     if not connection: return
     try:
         cursor = connection.cursor()
@@ -314,26 +701,299 @@ def init_leviathan_db():
             "account_status": "TEXT DEFAULT 'Active'",
             "total_queries": "INTEGER DEFAULT 0",
             "last_login": "TEXT",
-            "provider": "TEXT DEFAULT 'Local'"
+            "provider": "TEXT DEFAULT 'Local'",
+            "firm_id": "TEXT"
         }
-        cursor.execute("PRAGMA table_info(users)")
-        existing_user_cols = [col[1] for col in cursor.fetchall()]
+        existing_user_cols = backend.table_columns(cursor, "users")
         for col_name, col_type in required_user_columns.items():
             if col_name not in existing_user_cols:
                 cursor.execute(f"ALTER TABLE users ADD COLUMN {col_name} {col_type}")
         
         # Existing Table Structures
-        cursor.execute("CREATE TABLE IF NOT EXISTS chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT, init_date TEXT, chamber_type TEXT DEFAULT 'General Litigation', case_status TEXT DEFAULT 'Active', is_archived INTEGER DEFAULT 0, FOREIGN KEY(owner_email) REFERENCES users(email))")
-        cursor.execute("CREATE TABLE IF NOT EXISTS message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, sender_role TEXT, message_body TEXT, ts_created TEXT, token_count INTEGER DEFAULT 0, FOREIGN KEY(chamber_id) REFERENCES chambers(id))")
-        cursor.execute("CREATE TABLE IF NOT EXISTS law_assets (id INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT, filesize_kb REAL, page_count INTEGER, sync_timestamp TEXT, asset_status TEXT DEFAULT 'Verified')")
-        cursor.execute("CREATE TABLE IF NOT EXISTS system_telemetry (event_id INTEGER PRIMARY KEY AUTOINCREMENT, user_email TEXT, event_type TEXT, description TEXT, event_timestamp TEXT)")
+        pk = backend.pk_column
+        cursor.execute("CREATE TABLE IF NOT EXISTS firms (firm_id TEXT PRIMARY KEY, shard_file TEXT, created_at TEXT)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_firm ON users(firm_id)")
+        create_chamber_schema(connection, backend)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS law_assets (id {pk}, filename TEXT, filesize_kb REAL, page_count INTEGER, sync_timestamp TEXT, asset_status TEXT DEFAULT 'Verified')")
+        existing_asset_cols = backend.table_columns(cursor, "law_assets")
+        for col_name, col_type in {"content_hash": "TEXT", "text_chars": "INTEGER"}.items():
+            if col_name not in existing_asset_cols:
+                cursor.execute(f"ALTER TABLE law_assets ADD COLUMN {col_name} {col_type}")
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS system_telemetry (event_id {pk}, user_email TEXT, event_type TEXT, description TEXT, event_timestamp TEXT)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_ts ON system_telemetry(event_timestamp, user_email)")
+        connection.commit()
+
+        # Ingestion Dedupe: one repository copy per distinct document body
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_law_assets_hash ON law_assets(content_hash)")
+
+        # Statute Structure Index: Act → Part → Chapter → Section/Article with page offsets
+        cursor.execute("CREATE TABLE IF NOT EXISTS statute_acts (act_code TEXT PRIMARY KEY, title TEXT, act_year TEXT, filename TEXT, page_count INTEGER, indexed_at TEXT)")
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS statute_nodes (id {pk}, act_code TEXT, node_type TEXT, node_number TEXT, heading TEXT, parent_id INTEGER, page_start INTEGER, page_end INTEGER, char_offset INTEGER, body TEXT)")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_statute_nodes_citation ON statute_nodes(act_code, node_type, node_number)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS statute_xrefs (src_id INTEGER, dst_id INTEGER, PRIMARY KEY(src_id, dst_id))")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_statute_xrefs_dst ON statute_xrefs(dst_id)")
         connection.commit()
-    except sqlite3.Error as e:
+    except DB_ERRORS as e:
         st.error(f"DATABASE SCHEMA INITIALIZATION FAILED: {e}")
     finally:
         connection.close()
 
 init_leviathan_db()
+
+# ------------------------------------------------------------------------------
+# SECTION 4A: TENANT DIRECTORY & FIRM SHARD ROUTING
+# ------------------------------------------------------------------------------
+# advocate_ai_v2.db is the directory: users, firms, telemetry and the law library.
+# Each firm's chambers and message_logs live in shards/<firm_id>.db, so one firm's
+# writes never queue behind another firm's SQLite writer lock. Independent counsel
+# (no firm) and the PostgreSQL backend (row-level locking) stay on the directory vault.
+
+def normalize_firm_id(raw):
+    """Firm IDs double as shard filenames: lowercase slug, or None for independent counsel."""
+    slug = re.sub(r"[^a-z0-9]+", "-", (raw or "").strip().lower()).strip("-")[:48]
+    return slug or None
+
+def shard_filename(firm_id):
+    return os.path.join(SYSTEM_CONFIG["SHARD_DIRECTORY"], f"{firm_id}.db")
+
+def init_tenant_shard(backend):
+    """
+    Shard schema: chamber tables plus a users stub anchoring the owner_email foreign key.
+    The stub also carries total_queries, so a consultation never writes to the directory.
+    """
+    # auto_vacuum only sticks if set before the header is written, and backend.connect()
+    # switches to WAL first, so a fresh shard gets it (and its first table) on a raw connection
+    raw = sqlite3.connect(backend.filename)
+    try:
+        raw.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        raw.execute("CREATE TABLE IF NOT EXISTS users (email TEXT PRIMARY KEY, total_queries INTEGER DEFAULT 0)")
+        raw.commit()
+    finally:
+        raw.close()
+    connection = backend.connect()
+    try:
+        if "total_queries" not in backend.table_columns(connection.cursor(), "users"):
+            connection.execute("ALTER TABLE users ADD COLUMN total_queries INTEGER DEFAULT 0")
+        create_chamber_schema(connection, backend)
+    finally:
+        connection.close()
+
+@st.cache_resource
+def get_tenant_shard_registry():
+    """
+    Process-wide routing table shared by every session.
+    Layout: {"lock": Lock, "backends": {firm_id: SQLiteBackend}, "members": {email: shard key}}
+    A counsel's firm is fixed at registration, so resolved routes never go stale.
+    """
+    return {"lock": threading.Lock(), "backends": {}, "members": {}}
+
+def get_shard_backend(firm_id):
+    """Backend holding a firm's chambers; the shard file is created and migrated on first use."""
+    if not firm_id:
+        return get_persistence_backend()
+    registry = get_tenant_shard_registry()
+    with registry["lock"]:
+        backend = registry["backends"].get(firm_id)
+        if backend is None:
+            os.makedirs(SYSTEM_CONFIG["SHARD_DIRECTORY"], exist_ok=True)
+            backend = SQLiteBackend(shard_filename(firm_id))
+            init_tenant_shard(backend)
+            registry["backends"][firm_id] = backend
+    return backend
+
+def resolve_tenant_shard(email):
+    """
+    Shard key for a counsel: their firm_id on SQLite, None for the directory vault.
+    The first resolution mirrors the email into the shard's users stub.
+    """
+    if get_persistence_backend().name != "sqlite":
+        return None
+    registry = get_tenant_shard_registry()
+    with registry["lock"]:
+        if email in registry["members"]:
+            return registry["members"][email]
+
+    conn = get_persistence_backend().connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT firm_id FROM users WHERE email=?", (email,))
+        res = cursor.fetchone()
+    finally:
+        conn.close()
+    if res is None:
+        return None  # unregistered: not cached, registration may follow
+
+    firm_id = res[0]
+    if firm_id:
+        shard = get_shard_backend(firm_id).connect()
+        try:
+            shard.execute("INSERT OR IGNORE INTO users (email) VALUES (?)", (email,))
+            shard.commit()
+        finally:
+            shard.close()
+    with registry["lock"]:
+        registry["members"][email] = firm_id
+    return firm_id
+
+def get_tenant_connection(email):
+    """Connection to the store holding a counsel's chambers: their firm shard or the directory."""
+    try:
+        return get_shard_backend(resolve_tenant_shard(email)).connect()
+    except DB_ERRORS + (RuntimeError, OSError) as e:
+        st.error(f"CRITICAL: Tenant Shard Routing Failure. Details: {e}")
+        return None
+
+def list_tenant_shards():
+    """[(firm_id, backend)] for every firm registered in the directory (empty on PostgreSQL)."""
+    if get_persistence_backend().name != "sqlite":
+        return []
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT firm_id FROM firms ORDER BY firm_id")
+        firm_ids = [r[0] for r in cursor.fetchall()]
+    finally:
+        conn.close()
+    return [(firm_id, get_shard_backend(firm_id)) for firm_id in firm_ids]
+
+def tenant_shard_files():
+    """Registered shard paths via raw sqlite3, safe to call from the maintenance thread."""
+    conn = sqlite3.connect(SYSTEM_CONFIG["DB_FILENAME"], timeout=30)
+    try:
+        return [shard_filename(r[0]) for r in conn.execute("SELECT firm_id FROM firms ORDER BY firm_id")]
+    finally:
+        conn.close()
+
+# Runs in its own interpreter (sys.executable -c) so each tenant writes from a separate
+# process, as separate app replicas would: no shared GIL, only the SQLite file locks.
+# The worker loads this app against the scratch layout and drives db_log_consultation.
+_TENANT_WRITE_WORKER = """
+import importlib.util, json, os, sys, time
+job = json.loads(sys.argv[1])
+spec = importlib.util.spec_from_file_location("leviathan_app", job["app"])
+app = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(app)
+app.SYSTEM_CONFIG.update(job["config"])
+app.get_persistence_backend.clear()
+app.get_tenant_shard_registry.clear()
+app.resolve_tenant_shard(job["email"])
+print("ready", flush=True)
+sys.stdin.readline()
+latencies = []
+started = time.time()
+for i in range(job["writes"]):
+    t0 = time.perf_counter()
+    app.db_log_consultation(job["email"], job["chamber"], "user", f"Load test consultation {i}")
+    latencies.append(time.perf_counter() - t0)
+print(json.dumps({"started": started, "finished": time.time(), "latencies": latencies}), flush=True)
+"""
+
+def _seed_tenant_layout(layout_dir, tenants, sharded):
+    """
+    Scratch directory vault with one counsel per tenant: independent counsel sharing the
+    directory (shared) or each in their own firm shard (sharded). Returns [(email, store)].
+    """
+    os.makedirs(os.path.join(layout_dir, "shards"))
+    directory = SQLiteBackend(os.path.join(layout_dir, "directory.db"))
+    init_leviathan_db(directory)
+    ts = "2026-01-01 00:00:00"
+    tenants_seeded = []
+    conn = directory.connect()
+    try:
+        for t in range(tenants):
+            email, firm_id = f"counsel{t}@firm{t}.pk", f"firm{t}" if sharded else None
+            conn.execute("INSERT INTO users (email, full_name, registration_date, firm_id) VALUES (?, ?, ?, ?)",
+                         (email, f"Counsel {t}", ts, firm_id))
+            store = directory
+            if firm_id:
+                store = SQLiteBackend(os.path.join(layout_dir, "shards", f"{firm_id}.db"))
+                conn.execute("INSERT INTO firms (firm_id, shard_file, created_at) VALUES (?, ?, ?)", (firm_id, store.filename, ts))
+                init_tenant_shard(store)
+                shard = store.connect()
+                try:
+                    shard.execute("INSERT INTO users (email) VALUES (?)", (email,))
+                    shard.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)",
+                                  (email, "Load Test Chamber", ts))
+                    shard.commit()
+                finally:
+                    shard.close()
+            else:
+                conn.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)",
+                             (email, "Load Test Chamber", ts))
+            tenants_seeded.append((email, store))
+        conn.commit()
+    finally:
+        conn.close()
+    return tenants_seeded
+
+def benchmark_tenant_writes(tenant_counts=(1, 2, 4, 8), writes_per_tenant=500):
+    """
+    Consultation throughput vs tenant count through the real db_log_consultation path
+    (chamber lookup, transcript insert, query counter). Each tenant logs from its own
+    process, first with every tenant as independent counsel in one shared directory vault,
+    then with one firm shard per tenant. Workers load the app, report ready and start
+    together on one signal; throughput spans the first worker's start to the last worker's
+    finish. Runs on scratch files so the live directory and shards stay untouched. Lost
+    counts consultations that never reached the transcript (writer lock contention).
+    """
+    scratch = tempfile.mkdtemp(prefix="leviathan-shards-")
+    results = []
+    try:
+        for tenants in tenant_counts:
+            row = {"Tenants": tenants}
+            for layout in ("Shared", "Sharded"):
+                layout_dir = os.path.join(scratch, f"{layout.lower()}-{tenants}")
+                seeded = _seed_tenant_layout(layout_dir, tenants, sharded=layout == "Sharded")
+                config = {
+                    "DB_FILENAME": os.path.join(layout_dir, "directory.db"),
+                    "COLD_DB_FILENAME": os.path.join(layout_dir, "directory.cold.db"),
+                    "SHARD_DIRECTORY": os.path.join(layout_dir, "shards")
+                }
+                workers = [
+                    subprocess.Popen(
+                        [sys.executable, "-c", _TENANT_WRITE_WORKER, json.dumps({
+                            "app": os.path.abspath(__file__), "config": config, "email": email,
+                            "chamber": "Load Test Chamber", "writes": writes_per_tenant
+                        })],
+                        cwd=layout_dir, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL, text=True
+                    )
+                    for email, _ in seeded
+                ]
+                for w in workers:
+                    while w.stdout.readline().strip() not in ("ready", ""):
+                        pass
+                for w in workers:
+                    w.stdin.write("go\n")
+                    w.stdin.close()
+                reports = [json.loads(w.stdout.read().strip().splitlines()[-1]) for w in workers]
+                for w in workers:
+                    w.wait()
+                wall = max(r["finished"] for r in reports) - min(r["started"] for r in reports)
+
+                logged = 0
+                for email, store in seeded:
+                    conn = store.connect()
+                    try:
+                        logged += conn.execute(
+                            "SELECT COUNT(*) FROM message_logs m JOIN chambers c ON c.id = m.chamber_id WHERE c.owner_email = ?",
+                            (email,)
+                        ).fetchone()[0]
+                    finally:
+                        conn.close()
+
+                latencies = sorted(lat for r in reports for lat in r["latencies"])
+                row[f"{layout} Writes/s"] = round(logged / wall)
+                row[f"{layout} p95 (ms)"] = round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2) if latencies else 0
+                row[f"{layout} Lost"] = tenants * writes_per_tenant - logged
+            row["Speedup"] = f"{row['Sharded Writes/s'] / max(row['Shared Writes/s'], 1):.2f}x"
+            results.append(row)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
 #-------------------------------------------------------------------------------
 # SECTION 5: DATABASE TRANSACTIONAL OPERATIONS (CRUD)
 # ------------------------------------------------------------------------------
@@ -350,15 +1010,20 @@ def db_log_event(email, event_type, desc):
                 VALUES (?, ?, ?, ?)
             ''', (email, event_type, desc, ts))
             conn.commit()
-        except sqlite3.Error as log_err:
+        except DB_ERRORS as log_err:
             print(f"Telemetry Error: {log_err}")
         finally:
             conn.close()
 
-def db_create_vault_user(email, name, password, provider='Local'):
-    """ Registers a new identity in the sovereign vault. """
+def db_create_vault_user(email, name, password, provider='Local', firm_id=None):
+    """
+    Registers a new identity in the sovereign vault. Counsel registered under a firm
+    get their chambers provisioned in that firm's shard. A record restored from a snapshot
+    without vault keys is claimed instead: it keeps its firm and chambers and gains the key.
+    """
     if not email or not password or not name:
         return False
+    firm_id = normalize_firm_id(firm_id)
         
     conn = get_db_connection()
     if not conn:
@@ -367,27 +1032,48 @@ def db_create_vault_user(email, name, password, provider='Local'):
     try:
         cursor = conn.cursor()
         
-        # Duplicate Prevention
-        cursor.execute("SELECT email FROM users WHERE email = ?", (email,))
-        if cursor.fetchone():
+        # Duplicate Prevention (keyless restored records are the one exception)
+        cursor.execute("SELECT vault_key FROM users WHERE email = ?", (email,))
+        existing = cursor.fetchone()
+        if existing and existing[0] is not None:
             return False
             
         ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        if existing:
+            cursor.execute('''
+                UPDATE users SET full_name=?, vault_key=?, last_login=?, provider=?
+                WHERE email=? AND vault_key IS NULL
+            ''', (name, password, ts, provider, email))
+            if cursor.rowcount == 0:
+                return False
+            conn.commit()
+            # No-op when the snapshot already restored the default chamber
+            db_create_chamber(email, "General Litigation Chamber")
+            db_log_event(email, "REGISTRATION", f"Restored account claimed via {provider}")
+            return True
         
         # Atomic Transaction 1: User Profile
         cursor.execute('''
-            INSERT INTO users (email, full_name, vault_key, registration_date, last_login, provider) 
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (email, name, password, ts, ts, provider))
+            INSERT INTO users (email, full_name, vault_key, registration_date, last_login, provider, firm_id) 
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (email, name, password, ts, ts, provider, firm_id))
         
-        # Atomic Transaction 2: Initial Chamber Allocation
-        cursor.execute('''
-            INSERT INTO chambers (owner_email, chamber_name, init_date) 
-            VALUES (?, ?, ?)
-        ''', (email, "General Litigation Chamber", ts))
+        # Atomic Transaction 2: Initial Chamber Allocation (directory vault) or Firm Directory Entry
+        if firm_id is None:
+            cursor.execute('''
+                INSERT INTO chambers (owner_email, chamber_name, init_date) 
+                VALUES (?, ?, ?)
+            ''', (email, "General Litigation Chamber", ts))
+        else:
+            shard_file = shard_filename(firm_id) if get_persistence_backend().name == "sqlite" else None
+            cursor.execute(get_persistence_backend().insert_or_ignore("firms", ["firm_id", "shard_file", "created_at"]),
+                           (firm_id, shard_file, ts))
         
         conn.commit()
-        db_log_event(email, "REGISTRATION", f"New account provisioned via {provider}")
+        if firm_id is not None:
+            db_create_chamber(email, "General Litigation Chamber")
+        db_log_event(email, "REGISTRATION", f"New account provisioned via {provider}" + (f" (firm: {firm_id})" if firm_id else ""))
         return True
     except Exception as e:
         st.error(f"VAULT WRITE ERROR: {e}")
@@ -417,15 +1103,15 @@ def db_verify_vault_access(email, password):
             return result[0]
             
         return None
-    except sqlite3.Error as auth_err:
+    except DB_ERRORS as auth_err:
         st.error(f"Authentication Engine Fault: {auth_err}")
         return None
     finally:
         conn.close()
 
 def db_log_consultation(email, chamber_name, role, content):
-    """Persistently records every AI/User interaction."""
-    conn = get_db_connection()
+    """Persistently records every AI/User interaction (transcript and query counter in the tenant store)."""
+    conn = get_tenant_connection(email)
     if not conn:
         return
         
@@ -446,8 +1132,8 @@ def db_log_consultation(email, chamber_name, role, content):
             ''', (ch_id, role, content, ts))
             
             if role == "user":
+                # Shard users stub for firm counsel, directory row otherwise: same store, same commit
                 cursor.execute("UPDATE users SET total_queries = total_queries + 1 WHERE email = ?", (email,))
-                
             conn.commit()
     except Exception as log_err:
         st.error(f"Consultation Logging Failure: {log_err}")
@@ -455,99 +1141,2257 @@ def db_log_consultation(email, chamber_name, role, content):
         conn.close()
 
 def db_fetch_chamber_history(email, chamber_name):
-    """Retrieves full litigation transcript for a specific chamber."""
-    conn = get_db_connection()
+    """
+    Retrieves full litigation transcript for a specific chamber.
+    Archived chambers are transparently merged with their cold-tier transcript.
+    """
+    conn = get_tenant_connection(email)
     history = []
-    
+
     if conn:
         try:
             cursor = conn.cursor()
-            query = '''
-                SELECT m.sender_role, m.message_body 
-                FROM message_logs m 
-                JOIN chambers c ON m.chamber_id = c.id 
-                WHERE c.owner_email=? AND c.chamber_name=? 
-                ORDER BY m.id ASC
-            '''
-            cursor.execute(query, (email, chamber_name))
-            rows = cursor.fetchall()
-            
+            cursor.execute("SELECT id, is_archived FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
+            chamber = cursor.fetchone()
+            rows = []
+
+            if chamber:
+                ch_id, is_archived = chamber
+                cursor.execute("SELECT id, sender_role, message_body FROM message_logs WHERE chamber_id=? ORDER BY id ASC", (ch_id,))
+                rows = cursor.fetchall()
+                if is_archived:
+                    # Merge by message id: an interrupted tiering run leaves rows in both tiers
+                    merged = {r[0]: tuple(r[:3]) for r in cold_fetch_chamber_rows(ch_id, resolve_tenant_shard(email))}
+                    merged.update({r[0]: tuple(r) for r in rows})
+                    rows = [merged[k] for k in sorted(merged)]
+
             for r in rows:
-                history.append({"role": r[0], "content": r[1]})
-        except sqlite3.Error as e:
+                history.append({"role": r[1], "content": r[2]})
+        except DB_ERRORS as e:
             st.error(f"History Retrieval Error: {e}")
         finally:
             conn.close()
             
     return history
 
-# Initialize the Sovereign Database on Load
-init_leviathan_db()
-
 # ------------------------------------------------------------------------------
-# SECTION 6: CORE ANALYTICAL SERVICES (AI ENGINE & SMTP GATEWAY)
+# SECTION 5A: CHAMBER REGISTRY (CREATE / RENAME / ARCHIVE + READ CACHE)
 # ------------------------------------------------------------------------------
 
 @st.cache_resource
-def get_analytical_engine():
-    """Configures the Gemini 1.5 High-Context Model for Legal Analysis."""
+def get_chamber_registry_cache():
+    """
+    Process-wide chamber list cache shared by every session.
+    Layout: {"lock": Lock, "owners": {email: {"active": [...], "archived": [...]}}, "versions": {email: int}}
+    Every chamber mutation below writes to SQL first, then bumps the owner's version and
+    drops their entry; a read only stores its result if no write landed while it ran.
+    """
+    return {"lock": threading.Lock(), "owners": {}, "versions": {}}
+
+def chamber_cache_enabled():
+    """
+    The registry cache is only coherent while this process is the sole writer (SQLite).
+    On the shared PostgreSQL backend other replicas mutate chambers too, so every read goes to SQL.
+    """
+    return get_persistence_backend().name == "sqlite"
+
+def db_fetch_user_chambers(email, archived=False):
+    """Returns the counsel's chamber names (active by default), served from memory when warm."""
+    registry = get_chamber_registry_cache()
+    bucket = "archived" if archived else "active"
+    use_cache = chamber_cache_enabled()
+
+    if use_cache:
+        with registry["lock"]:
+            cached = registry["owners"].get(email)
+            if cached is not None:
+                return list(cached[bucket])
+            version = registry["versions"].get(email, 0)
+
+    conn = get_tenant_connection(email)
+    if not conn:
+        return []
+
     try:
-        api_key = st.secrets["GOOGLE_API_KEY"]
-        return ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash", 
-            google_api_key=api_key, 
-            temperature=0.0
-        )
-    except Exception as e:
-        st.error(f"AI ENGINE INITIALIZATION ERROR: {e}")
-        return None
+        cursor = conn.cursor()
+        cursor.execute("SELECT chamber_name FROM chambers WHERE owner_email=? AND is_archived=0 ORDER BY id ASC", (email,))
+        active = [r[0] for r in cursor.fetchall()]
+        cursor.execute("SELECT chamber_name FROM chambers WHERE owner_email=? AND is_archived=1 ORDER BY id ASC", (email,))
+        archived_list = [r[0] for r in cursor.fetchall()]
+    except DB_ERRORS as e:
+        st.error(f"Chamber Registry Read Error: {e}")
+        return []
+    finally:
+        conn.close()
+
+    if use_cache:
+        with registry["lock"]:
+            # A write committed mid-read may be missing from these lists: leave the entry cold
+            if registry["versions"].get(email, 0) == version:
+                registry["owners"][email] = {"active": active, "archived": archived_list}
+
+    return list(archived_list if archived else active)
+
+def _chamber_cache_invalidate(email):
+    """Called after a committed chamber write: the next read reloads the owner's lists from SQL."""
+    registry = get_chamber_registry_cache()
+    with registry["lock"]:
+        registry["versions"][email] = registry["versions"].get(email, 0) + 1
+        registry["owners"].pop(email, None)
+
+def db_create_chamber(email, chamber_name, chamber_type="General Litigation"):
+    """Provisions a new case chamber. Returns False on empty or duplicate titles."""
+    chamber_name = (chamber_name or "").strip()
+    if not email or not chamber_name:
+        return False
+
+    conn = get_tenant_connection(email)
+    if not conn:
+        return False
 
-def dispatch_legal_brief(target_email, chamber_name, history_data):
-    """Generates and emails a formal legal transcript via SMTP."""
     try:
-        sender_user = st.secrets["EMAIL_USER"]
-        sender_pass = st.secrets["EMAIL_PASS"].replace(" ", "")
-        
-        msg = MIMEMultipart()
-        msg['From'] = f"Alpha Apex Chambers <{sender_user}>"
-        msg['To'] = target_email
-        msg['Subject'] = f"LEGAL BRIEF: {chamber_name} - {datetime.date.today()}"
-        
-        # Construct Transcript Body
-        body = f"--- ALPHA APEX LEGAL INTELLIGENCE BRIEF ---\n"
-        body += f"CHAMBER: {chamber_name}\n"
-        body += f"STATUS: CONFIDENTIAL PRIVILEGED\n\n"
-        
-        for entry in history_data:
-            role_label = "COUNSEL" if entry['role'] == 'user' else "AI ADVISOR"
-            body += f"[{role_label}]:\n{entry['content']}\n\n"
-            
-        body += "\n--- END OF BRIEF ---\nGenerated by Leviathan v36.5"
-        
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-        
-        server = smtplib.SMTP(SYSTEM_CONFIG["SMTP_SERVER"], SYSTEM_CONFIG["SMTP_PORT"])
-        server.starttls()
-        server.login(sender_user, sender_pass)
-        server.send_message(msg)
-        server.quit()
-        return True
-    except Exception as smtp_err:
-        st.error(f"SMTP Dispatch Failure: {smtp_err}")
+        cursor = conn.cursor()
+        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.execute('''
+            INSERT INTO chambers (owner_email, chamber_name, init_date, chamber_type)
+            VALUES (?, ?, ?, ?)
+        ''', (email, chamber_name, ts, chamber_type))
+        conn.commit()
+    except DB_INTEGRITY_ERRORS:
         return False
+    except DB_ERRORS as e:
+        st.error(f"Chamber Provisioning Failure: {e}")
+        return False
+    finally:
+        conn.close()
 
-# ------------------------------------------------------------------------------
-# SECTION 7: GOOGLE OAUTH CALLBACK & AUTO-REGISTRATION HANDLER
-# ------------------------------------------------------------------------------
+    _chamber_cache_invalidate(email)
+    db_log_event(email, "CHAMBER_CREATE", f"{chamber_type} chamber '{chamber_name}' provisioned")
+    return True
 
-# ------------------------------------------------------------------------------
-# SECTION 7: GOOGLE OAUTH CALLBACK & AUTO-REGISTRATION HANDLER
-# ------------------------------------------------------------------------------
+def db_rename_chamber(email, old_name, new_name):
+    """Renames a chamber in place; transcripts follow via chamber_id."""
+    new_name = (new_name or "").strip()
+    if not new_name or new_name == old_name:
+        return False
 
-def handle_google_callback():
-    params = st.query_params
-    if "code" in params:
-        st.session_state.logged_in = True
+    conn = get_tenant_connection(email)
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE chambers SET chamber_name=? WHERE owner_email=? AND chamber_name=?", (new_name, email, old_name))
+        if cursor.rowcount == 0:
+            return False
+        conn.commit()
+    except DB_INTEGRITY_ERRORS:
+        return False
+    except DB_ERRORS as e:
+        st.error(f"Chamber Rename Failure: {e}")
+        return False
+    finally:
+        conn.close()
+
+    _chamber_cache_invalidate(email)
+    db_log_event(email, "CHAMBER_RENAME", f"'{old_name}' renamed to '{new_name}'")
+    return True
+
+def db_set_chamber_archived(email, chamber_name, archived=True):
+    """Archives (case closed) or restores (case re-opened) a chamber."""
+    conn = get_tenant_connection(email)
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE chambers SET is_archived=?, case_status=?
+            WHERE owner_email=? AND chamber_name=? AND is_archived=?
+        ''', (1 if archived else 0, "Closed" if archived else "Active", email, chamber_name, 0 if archived else 1))
+        if cursor.rowcount == 0:
+            return False
+        conn.commit()
+    except DB_ERRORS as e:
+        st.error(f"Chamber Archive Failure: {e}")
+        return False
+    finally:
+        conn.close()
+
+    _chamber_cache_invalidate(email)
+
+    # Re-opened cases return to the hot tier so new consultations append in order
+    if not archived:
+        cold_rehydrate_chamber(email, chamber_name)
+
+    db_log_event(email, "CHAMBER_ARCHIVE" if archived else "CHAMBER_RESTORE", f"'{chamber_name}'")
+    return True
+
+# ------------------------------------------------------------------------------
+# SECTION 5B: ARCHIVE TIERING (COMPRESSED COLD TRANSCRIPT STORE)
+# ------------------------------------------------------------------------------
+
+def cold_tier_enabled():
+    """
+    The cold store is a local file. On the shared PostgreSQL backend a blob written by one
+    replica would be invisible to the others, so tiering stays off and transcripts stay in SQL.
+    """
+    return get_persistence_backend().name == "sqlite"
+
+def cold_store_filename(firm_id=None):
+    """
+    Cold tier sits beside its hot store: chamber ids are only unique within one shard.
+    The '.' separator can never appear in a firm ID, so no firm's shard shares this name.
+    """
+    if not firm_id:
+        return SYSTEM_CONFIG["COLD_DB_FILENAME"]
+    return os.path.join(SYSTEM_CONFIG["SHARD_DIRECTORY"], f"{firm_id}.cold.db")
+
+def get_cold_store_connection(firm_id=None):
+    """Opens the cold-tier vault: one compressed transcript blob per archived chamber."""
+    try:
+        connection = sqlite3.connect(cold_store_filename(firm_id), check_same_thread=False)
+        connection.execute('''
+            CREATE TABLE IF NOT EXISTS cold_transcripts (
+                chamber_id INTEGER PRIMARY KEY, owner_email TEXT, chamber_name TEXT,
+                codec TEXT, message_count INTEGER, raw_bytes INTEGER, stored_bytes INTEGER,
+                archived_at TEXT, payload BLOB
+            )
+        ''')
+        return connection
+    except DB_ERRORS as e:
+        st.error(f"Cold Storage Engine Failure: {e}")
+        return None
+
+def _cold_compress(raw):
+    """Compresses a transcript payload. Returns (codec, blob)."""
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=19).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+def _cold_decompress(codec, blob):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this cold-tier transcript")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+def cold_fetch_chamber_rows(chamber_id, firm_id=None):
+    """Decompresses a chamber's cold transcript. Rows: [id, role, body, ts_created, token_count]."""
+    if not cold_tier_enabled():
+        return []
+    cold = get_cold_store_connection(firm_id)
+    if not cold:
+        return []
+    try:
+        res = cold.execute("SELECT codec, payload FROM cold_transcripts WHERE chamber_id=?", (chamber_id,)).fetchone()
+        if not res:
+            return []
+        return json.loads(_cold_decompress(res[0], res[1]).decode("utf-8"))
+    except (sqlite3.Error, RuntimeError, zlib.error) as e:
+        st.error(f"Cold Transcript Rehydration Error: {e}")
+        return []
+    finally:
+        cold.close()
+
+def _tier_store(firm_id, backend, report):
+    """Tiers one hot store (directory vault or firm shard) into its own cold store."""
+    try:
+        conn = backend.connect()
+    except DB_ERRORS + (RuntimeError,) as e:
+        st.error(f"Archive Tiering Failure ({firm_id or 'directory'}): {e}")
+        return
+    cold = get_cold_store_connection(firm_id)
+    if not cold:
+        conn.close()
+        return
+
+    try:
+        hot_bytes, free_before = backend.space_profile(conn)
+        report["hot_bytes"] += hot_bytes
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT DISTINCT c.id, c.owner_email, c.chamber_name
+            FROM chambers c JOIN message_logs m ON m.chamber_id = c.id
+            WHERE c.is_archived = 1
+        ''')
+        candidates = cursor.fetchall()
+
+        for ch_id, owner, ch_name in candidates:
+            cursor.execute('''
+                SELECT id, sender_role, message_body, ts_created, token_count
+                FROM message_logs WHERE chamber_id=? ORDER BY id ASC
+            ''', (ch_id,))
+            hot_rows = [list(r) for r in cursor.fetchall()]
+
+            merged = {r[0]: r for r in cold_fetch_chamber_rows(ch_id, firm_id)}
+            merged.update({r[0]: r for r in hot_rows})
+            rows = [merged[k] for k in sorted(merged)]
+
+            raw = json.dumps(rows, ensure_ascii=False).encode("utf-8")
+            codec, blob = _cold_compress(raw)
+            ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cold.execute('''
+                INSERT OR REPLACE INTO cold_transcripts
+                (chamber_id, owner_email, chamber_name, codec, message_count, raw_bytes, stored_bytes, archived_at, payload)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (ch_id, owner, ch_name, codec, len(rows), len(raw), len(blob), ts, blob))
+            cold.commit()
+
+            cursor.execute("DELETE FROM message_logs WHERE chamber_id=? AND id<=?", (ch_id, hot_rows[-1][0]))
+            conn.commit()
+
+            report["chambers"] += 1
+            report["messages"] += len(hot_rows)
+            report["raw_bytes"] += len(raw)
+            report["stored_bytes"] += len(blob)
+
+        free_after = backend.space_profile(conn)[1]
+        report["reclaimed_bytes"] += max(0, free_after - free_before)
+    except DB_ERRORS + (RuntimeError, zlib.error) as e:
+        st.error(f"Archive Tiering Failure ({firm_id or 'directory'}): {e}")
+    finally:
+        conn.close()
+        cold.close()
+
+def db_tier_archived_chambers():
+    """
+    Moves message_logs of archived chambers into the compressed cold store, for the
+    directory vault and every firm shard. The cold blob is committed before hot rows are
+    deleted; re-runs merge by message id, so an interrupted job never loses or duplicates
+    messages. Returns a space report dict.
+    """
+    report = {"chambers": 0, "messages": 0, "raw_bytes": 0, "stored_bytes": 0,
+              "hot_bytes": 0, "reclaimed_bytes": 0}
+    if not cold_tier_enabled():
+        return report
+    try:
+        stores = [(None, get_persistence_backend())] + list_tenant_shards()
+    except DB_ERRORS + (RuntimeError, OSError) as e:
+        st.error(f"Archive Tiering Failure: {e}")
+        return report
+
+    for firm_id, backend in stores:
+        _tier_store(firm_id, backend, report)
+    db_log_event("SYSTEM", "ARCHIVE_TIERING",
+                 f"{report['messages']} messages from {report['chambers']} chambers moved to cold tier")
+    return report
+
+def cold_rehydrate_chamber(email, chamber_name):
+    """Moves a restored chamber's cold transcript back into message_logs."""
+    if not cold_tier_enabled():
+        return 0
+    firm_id = resolve_tenant_shard(email)
+    conn = get_tenant_connection(email)
+    cold = get_cold_store_connection(firm_id)
+    if not conn or not cold:
+        for handle in (conn, cold):
+            if handle:
+                handle.close()
+        return 0
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
+        res = cursor.fetchone()
+        if not res:
+            return 0
+        rows = cold_fetch_chamber_rows(res[0], firm_id)
+        if rows:
+            insert_sql = get_shard_backend(firm_id).insert_or_ignore(
+                "message_logs", ["id", "chamber_id", "sender_role", "message_body", "ts_created", "token_count"]
+            )
+            cursor.executemany(insert_sql, [(r[0], res[0], r[1], r[2], r[3], r[4]) for r in rows])
+            conn.commit()
+            cold.execute("DELETE FROM cold_transcripts WHERE chamber_id=?", (res[0],))
+            cold.commit()
+        return len(rows)
+    except DB_ERRORS as e:
+        st.error(f"Cold Transcript Restore Failure: {e}")
+        return 0
+    finally:
+        conn.close()
+        cold.close()
+
+def cold_store_summary():
+    """Aggregate cold-tier footprint (directory + firm shards) for the admin console."""
+    summary = {"chambers": 0, "messages": 0, "raw_bytes": 0, "stored_bytes": 0}
+    for firm_id in [None] + [f for f, _ in list_tenant_shards()]:
+        cold = get_cold_store_connection(firm_id)
+        if not cold:
+            continue
+        try:
+            res = cold.execute("SELECT COUNT(*), SUM(message_count), SUM(raw_bytes), SUM(stored_bytes) FROM cold_transcripts").fetchone()
+        finally:
+            cold.close()
+        for key, value in zip(("chambers", "messages", "raw_bytes", "stored_bytes"), res):
+            summary[key] += value or 0
+    return summary
+
+# ------------------------------------------------------------------------------
+# SECTION 5C: DATABASE MAINTENANCE SCHEDULER (CHECKPOINT / VACUUM / BACKUP)
+# ------------------------------------------------------------------------------
+
+def maintenance_wal_checkpoint(conn, force=False, db_path=None):
+    """Truncates the -wal file once it crosses the configured threshold."""
+    wal_path = (db_path or SYSTEM_CONFIG["DB_FILENAME"]) + "-wal"
+    wal_bytes = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    if not force and wal_bytes < SYSTEM_CONFIG["WAL_CHECKPOINT_BYTES"]:
+        return None
+    busy, log_frames, done_frames = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    return f"wal {wal_bytes // 1024} KB | frames {done_frames}/{log_frames} | busy={busy}"
+
+def maintenance_incremental_vacuum(conn):
+    """
+    Returns free pages to the filesystem in bounded slices.
+    Legacy files created without auto_vacuum=INCREMENTAL are converted by one full VACUUM.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        return "converted to auto_vacuum=INCREMENTAL (full VACUUM)"
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if free_pages == 0:
+        return None
+    conn.execute(f"PRAGMA incremental_vacuum({int(SYSTEM_CONFIG['VACUUM_PAGES_PER_RUN'])})")
+    return f"{min(free_pages, SYSTEM_CONFIG['VACUUM_PAGES_PER_RUN'])} of {free_pages} free pages released"
+
+def maintenance_optimize(conn, first_run=False):
+    """Refreshes planner statistics: full ANALYZE once per process, PRAGMA optimize thereafter."""
+    if first_run:
+        conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    return "ANALYZE + optimize" if first_run else "optimize"
+
+def maintenance_backup():
+    """Hot online backup of the directory, firm shards and cold stores via the sqlite3 backup API, with rotation."""
+    backup_dir = SYSTEM_CONFIG["BACKUP_DIRECTORY"]
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    written = []
+    shard_paths = tenant_shard_files()
+    sources = [SYSTEM_CONFIG["DB_FILENAME"], SYSTEM_CONFIG["COLD_DB_FILENAME"]] + shard_paths
+    sources += [path[:-3] + ".cold.db" for path in shard_paths]
+
+    for source_path in sources:
+        if not os.path.exists(source_path):
+            continue
+        base = os.path.splitext(os.path.basename(source_path))[0]
+        target_path = os.path.join(backup_dir, f"{base}-{stamp}.db")
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            # Copy in page batches so concurrent writers are only paused between steps
+            source.backup(target, pages=1024, sleep=0.005)
+        finally:
+            target.close()
+            source.close()
+        written.append(target_path)
+
+        # Rotation: keep the newest N snapshots per store
+        # (exact stamp match: firm "acme" must not rotate out "acme-2" snapshots)
+        snapshots = sorted(f for f in os.listdir(backup_dir) if re.fullmatch(re.escape(base) + r"-\d{8}-\d{6}\.db", f))
+        for stale in snapshots[:-SYSTEM_CONFIG["BACKUP_RETENTION"]]:
+            os.remove(os.path.join(backup_dir, stale))
+
+    return ", ".join(os.path.basename(p) for p in written) or None
+
+def run_maintenance_cycle(state, force=False):
+    """Runs every maintenance task that is due and records its timings in the scheduler state."""
+    now = time.time()
+    due = {
+        "wal_checkpoint": True,
+        "incremental_vacuum": force or now - state["last_run"].get("incremental_vacuum", 0) >= SYSTEM_CONFIG["VACUUM_INTERVAL_SEC"],
+        "optimize": force or now - state["last_run"].get("optimize", 0) >= SYSTEM_CONFIG["OPTIMIZE_INTERVAL_SEC"],
+        "backup": force or now - state["last_run"].get("backup", 0) >= SYSTEM_CONFIG["BACKUP_INTERVAL_SEC"]
+    }
+
+    with state["lock"]:
+        for task, is_due in due.items():
+            if not is_due:
+                continue
+            started = time.perf_counter()
+            try:
+                if task == "backup":
+                    result = maintenance_backup()
+                else:
+                    # Directory vault first, then every firm shard; each file gets its own pass
+                    outcomes = []
+                    for db_path in [SYSTEM_CONFIG["DB_FILENAME"]] + tenant_shard_files():
+                        conn = sqlite3.connect(db_path, timeout=30)
+                        try:
+                            if task == "wal_checkpoint":
+                                outcome = maintenance_wal_checkpoint(conn, force=force, db_path=db_path)
+                            elif task == "incremental_vacuum":
+                                outcome = maintenance_incremental_vacuum(conn)
+                            else:
+                                outcome = maintenance_optimize(conn, first_run="optimize" not in state["last_run"])
+                        finally:
+                            conn.close()
+                        if outcome is not None:
+                            label = "" if db_path == SYSTEM_CONFIG["DB_FILENAME"] else f"{os.path.basename(db_path)}: "
+                            outcomes.append(label + outcome)
+                    result = " | ".join(outcomes) or None
+            except (sqlite3.Error, OSError) as maint_err:
+                result = f"FAILED: {maint_err}"
+
+            if result is None:
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            state["last_run"][task] = now
+            entry = state["timings"].setdefault(task, {"runs": 0, "total_ms": 0.0})
+            entry["runs"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["last_ms"] = round(elapsed_ms, 2)
+            entry["last_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            entry["last_result"] = result
+
+def _maintenance_loop(state):
+    while not state["stop"].wait(SYSTEM_CONFIG["MAINTENANCE_TICK_SEC"]):
+        run_maintenance_cycle(state)
+
+@st.cache_resource
+def get_maintenance_scheduler():
+    """Starts the process-wide maintenance thread once and returns its shared state."""
+    state = {
+        "lock": threading.Lock(),
+        "stop": threading.Event(),
+        "last_run": {"backup": time.time()},  # first snapshot after one full interval
+        "timings": {}
+    }
+    worker = threading.Thread(target=_maintenance_loop, args=(state,), name="leviathan-maintenance", daemon=True)
+    worker.start()
+    state["thread"] = worker
+    return state
+
+@leviathan_fragment
+def render_maintenance_panel():
+    """Admin console block: maintenance task timings and manual trigger."""
+    st.subheader("Database Maintenance")
+    if get_persistence_backend().name != "sqlite":
+        st.caption("PostgreSQL backend: checkpointing, vacuum and statistics are handled by the server (autovacuum).")
+        return
+    scheduler = get_maintenance_scheduler()
+
+    if st.button("🧹 Run Full Maintenance Now"):
+        run_maintenance_cycle(scheduler, force=True)
+
+    if scheduler["timings"]:
+        st.table([
+            {
+                "Task": task,
+                "Runs": t["runs"],
+                "Last (ms)": t["last_ms"],
+                "Avg (ms)": round(t["total_ms"] / t["runs"], 2),
+                "Last Run": t["last_at"],
+                "Result": t["last_result"]
+            }
+            for task, t in scheduler["timings"].items()
+        ])
+    else:
+        st.caption("No maintenance cycles recorded yet in this process.")
+
+# Initialize the Sovereign Database on Load
+init_leviathan_db()
+
+# ------------------------------------------------------------------------------
+# SECTION 5D: BULK SNAPSHOT EXPORT / IMPORT (PARQUET / ARROW IPC)
+# ------------------------------------------------------------------------------
+
+# table → (order key, Arrow schema, owner filter for single-counsel exports)
+# chambers / message_logs are read from every tenant store; their trailing firm_id column
+# names the shard a row came from (ids are only unique within one shard)
+SNAPSHOT_TABLES = {
+    "users": ("email", pa.schema([
+        ("email", pa.string()), ("full_name", pa.string()), ("vault_key", pa.string()),
+        ("registration_date", pa.string()), ("membership_tier", pa.string()), ("account_status", pa.string()),
+        ("total_queries", pa.int64()), ("last_login", pa.string()), ("provider", pa.string()), ("firm_id", pa.string())
+    ]), "email = ?"),
+    "chambers": ("id", pa.schema([
+        ("id", pa.int64()), ("owner_email", pa.string()), ("chamber_name", pa.string()),
+        ("init_date", pa.string()), ("chamber_type", pa.string()), ("case_status", pa.string()),
+        ("is_archived", pa.int64()), ("firm_id", pa.string())
+    ]), "owner_email = ?"),
+    "message_logs": ("id", pa.schema([
+        ("id", pa.int64()), ("chamber_id", pa.int64()), ("sender_role", pa.string()),
+        ("message_body", pa.string()), ("ts_created", pa.string()), ("token_count", pa.int64()), ("firm_id", pa.string())
+    ]), "chamber_id IN (SELECT id FROM chambers WHERE owner_email = ?)"),
+    "system_telemetry": ("event_id", pa.schema([
+        ("event_id", pa.int64()), ("user_email", pa.string()), ("event_type", pa.string()),
+        ("description", pa.string()), ("event_timestamp", pa.string())
+    ]), "user_email = ?")
+}
+SNAPSHOT_EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+SNAPSHOT_TENANT_TABLES = ("chambers", "message_logs")
+
+def _snapshot_writer(path, schema, fmt):
+    """Parquet (zstd row groups) or Arrow IPC file (zstd buffers); both accept write_batch()."""
+    if fmt == "arrow":
+        return pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+    return pq.ParquetWriter(path, schema, compression="zstd")
+
+def _snapshot_batches(path, fmt, batch_rows):
+    """Yields RecordBatches without loading the file: Parquet row groups / memory-mapped IPC."""
+    if fmt == "arrow":
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+    else:
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_rows)
+
+def _snapshot_cold_messages(cold_filename, conn, firm_id, owner_email, batch_rows):
+    """
+    Yields message_logs-shaped row chunks decompressed from a cold store, one transcript at
+    a time. Rows whose id is still hot in conn are skipped; the hot copy is exported instead.
+    """
+    cold = sqlite3.connect(cold_filename)
+    try:
+        sql, params = "SELECT chamber_id, codec, payload FROM cold_transcripts", ()
+        if owner_email:
+            sql, params = sql + " WHERE owner_email = ?", (owner_email,)
+        hot = conn.cursor()
+        chunk = []
+        for chamber_id, codec, payload in cold.execute(sql + " ORDER BY chamber_id", params):
+            hot.execute("SELECT id FROM message_logs WHERE chamber_id = ?", (chamber_id,))
+            hot_ids = {row[0] for row in hot.fetchall()}
+            for msg_id, role, body, ts_created, token_count in json.loads(_cold_decompress(codec, payload)):
+                if msg_id in hot_ids:
+                    continue
+                chunk.append((msg_id, chamber_id, role, body, ts_created, token_count, firm_id))
+                if len(chunk) >= batch_rows:
+                    yield chunk
+                    chunk = []
+        hot.close()
+        if chunk:
+            yield chunk
+    finally:
+        cold.close()
+
+def export_snapshot(backend, out_dir, fmt="parquet", owner_email=None, batch_rows=None, include_credentials=False,
+                    tenant_stores=None):
+    """
+    Streams users / chambers / message_logs / system_telemetry into out_dir from one read
+    snapshot per store, batch_rows at a time (fetchmany → RecordBatch → writer). Writers keep
+    committing meanwhile (WAL / MVCC). manifest.json is written last and marks the export
+    complete. Vault keys are exported only for restore / migration (include_credentials).
+    tenant_stores [(firm_id, backend, cold_filename)] supply chambers / message_logs, tagged
+    with their firm_id (default: backend alone). A store's cold_filename names the cold tier
+    beside it, whose archived transcripts are written out as ordinary message_logs rows.
+    """
+    batch_rows = batch_rows or SYSTEM_CONFIG["EXPORT_BATCH_ROWS"]
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {
+        "format": fmt,
+        "backend": backend.name,
+        "owner_email": owner_email,
+        "credentials": include_credentials,
+        "exported_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "tables": {}
+    }
+    tenant_stores = tenant_stores or [(None, backend, None)]
+    manifest["firms"] = [firm_id for firm_id, _, _ in tenant_stores if firm_id]
+    opened = []
+    try:
+        conn = backend.connect()
+        opened.append(conn)
+        backend.begin_snapshot(conn)
+        stores = []
+        for firm_id, store, cold_filename in tenant_stores:
+            store_conn = conn if store is backend else store.connect()
+            if store_conn is not conn:
+                opened.append(store_conn)
+                store.begin_snapshot(store_conn)
+            stores.append((firm_id, store, store_conn, cold_filename))
+
+        # Firm counsel's query counters live in their shard's users stub, not the directory row
+        shard_queries = {}
+        for _, _, store_conn, _ in stores:
+            if store_conn is not conn:
+                store_cursor = store_conn.cursor()
+                store_cursor.execute("SELECT email, total_queries FROM users")
+                shard_queries.update(store_cursor.fetchall())
+        queries_at = SNAPSHOT_TABLES["users"][1].names.index("total_queries")
+
+        for table, (order_key, schema, owner_filter) in SNAPSHOT_TABLES.items():
+            sources = stores if table in SNAPSHOT_TENANT_TABLES else [(None, backend, conn, None)]
+            filename = f"{table}.{SNAPSHOT_EXTENSIONS[fmt]}"
+            rows = 0
+            with _snapshot_writer(os.path.join(out_dir, filename), schema, fmt) as writer:
+                for firm_id, source, source_conn, cold_filename in sources:
+                    tagged = table in SNAPSHOT_TENANT_TABLES
+                    select_list = [
+                        "NULL" if name == "vault_key" and not include_credentials
+                        else "CAST(? AS TEXT)" if name == "firm_id" and tagged
+                        else name
+                        for name in schema.names
+                    ]
+                    sql = f"SELECT {', '.join(select_list)} FROM {table}"
+                    params = (firm_id,) if tagged else ()
+                    if owner_email:
+                        sql += f" WHERE {owner_filter}"
+                        params += (owner_email,)
+                    cursor = source.stream_cursor(source_conn)
+                    cursor.execute(f"{sql} ORDER BY {order_key}", params)
+                    chunks = iter(lambda: cursor.fetchmany(batch_rows), [])
+                    if table == "message_logs" and cold_filename and os.path.exists(cold_filename):
+                        # The hot snapshot is pinned first, so a chamber tiered mid-export shows up in
+                        # both stores and is deduped by id rather than lost
+                        chunks = itertools.chain(
+                            _snapshot_cold_messages(cold_filename, source_conn, firm_id, owner_email, batch_rows), chunks
+                        )
+                    for chunk in chunks:
+                        if table == "users" and shard_queries:
+                            chunk = [
+                                row[:queries_at] + (shard_queries.get(row[0], row[queries_at]),) + row[queries_at + 1:]
+                                for row in chunk
+                            ]
+                        columns = zip(*chunk)
+                        writer.write_batch(pa.RecordBatch.from_arrays(
+                            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                            schema=schema
+                        ))
+                        rows += len(chunk)
+                    cursor.close()
+            manifest["tables"][table] = {"file": filename, "rows": rows}
+    finally:
+        for store_conn in opened:
+            store_conn.rollback()
+            store_conn.close()
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+def import_snapshot(backend, snapshot_dir, batch_rows=None, tenant_backend_for=None):
+    """
+    Restores / migrates an export into backend. Chambers are re-keyed (old → new id map
+    carries message_logs across); a chamber whose (owner, title) already exists is kept
+    as-is with its messages, and a telemetry event already present (same counsel, type,
+    text and timestamp) is not inserted again, so re-running an import is idempotent.
+    tenant_backend_for(email) names the store that receives a counsel's chambers (their
+    firm shard); by default everything lands in backend. Each batch commits on its own
+    so live writers interleave instead of queueing behind one long write.
+    """
+    batch_rows = batch_rows or SYSTEM_CONFIG["EXPORT_BATCH_ROWS"]
+    with open(os.path.join(snapshot_dir, "manifest.json")) as fh:
+        manifest = json.load(fh)
+    fmt = manifest["format"]
+    path = lambda table: os.path.join(snapshot_dir, manifest["tables"][table]["file"])
+    report = {"users": 0, "chambers_created": 0, "chambers_skipped": 0, "chambers_orphaned": 0, "messages": 0, "telemetry": 0}
+
+    user_cols = SNAPSHOT_TABLES["users"][1].names
+    chamber_cols = SNAPSHOT_TABLES["chambers"][1].names[1:-1]
+    message_cols = SNAPSHOT_TABLES["message_logs"][1].names[1:-1]
+    telemetry_cols = SNAPSHOT_TABLES["system_telemetry"][1].names[1:]
+    insert_message = f"INSERT INTO message_logs ({', '.join(message_cols)}) VALUES ({', '.join('?' * len(message_cols))})"
+    insert_event = (
+        f"INSERT INTO system_telemetry ({', '.join(telemetry_cols)}) SELECT {', '.join('?' * len(telemetry_cols))} "
+        "WHERE NOT EXISTS (SELECT 1 FROM system_telemetry WHERE "
+        + " AND ".join(f"{c} IS NOT DISTINCT FROM ?" for c in telemetry_cols) + ")"
+    )
+    tenant_backend_for = tenant_backend_for or (lambda email: backend)
+
+    conn = backend.connect()
+    cursor = conn.cursor()
+    tenant_conns = {}  # id(store) → (store, connection, cursor), opened as owners are routed
+    routes = {}        # owner email → tenant_conns entry
+
+    def route(email):
+        if email not in routes:
+            store = tenant_backend_for(email)
+            if id(store) not in tenant_conns:
+                store_conn = conn if store is backend else store.connect()
+                tenant_conns[id(store)] = (store, store_conn, cursor if store_conn is conn else store_conn.cursor())
+            routes[email] = tenant_conns[id(store)]
+            if store is not backend and shard_queries.get(email):
+                # Firm shards are SQLite: carry the exported counter into the shard's users stub
+                routes[email][2].execute(
+                    "UPDATE users SET total_queries = MAX(total_queries, ?) WHERE email = ?", (shard_queries[email], email)
+                )
+        return routes[email]
+
+    def commit_all():
+        conn.commit()
+        for _, store_conn, _ in tenant_conns.values():
+            if store_conn is not conn:
+                store_conn.commit()
+
+    # (source firm_id, old chamber id) → (target cursor, new chamber id)
+    id_map = {}
+    shard_queries = {}  # firm counsel email → exported total_queries
+    try:
+        # Existing counsel records win; restored ones without a vault key are claimed by re-registering
+        for batch in _snapshot_batches(path("users"), fmt, batch_rows):
+            rows = list(zip(*[batch.column(name).to_pylist() for name in user_cols]))
+            for row in rows:
+                cursor.execute(backend.insert_or_ignore("users", user_cols), row)
+                report["users"] += max(cursor.rowcount, 0)
+                if row[user_cols.index("firm_id")]:
+                    shard_queries[row[0]] = row[user_cols.index("total_queries")]
+            for firm_id in {r[user_cols.index("firm_id")] for r in rows} - {None}:
+                cursor.execute(backend.insert_or_ignore("firms", ["firm_id", "shard_file", "created_at"]), (
+                    firm_id, shard_filename(firm_id) if backend.name == "sqlite" else None,
+                    datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                ))
+            conn.commit()
+
+        for batch in _snapshot_batches(path("chambers"), fmt, batch_rows):
+            rows = batch.to_pylist()
+            owners = sorted({row["owner_email"] for row in rows if row["owner_email"]})
+            registered = set()
+            for start in range(0, len(owners), 500):
+                chunk = owners[start:start + 500]
+                cursor.execute(f"SELECT email FROM users WHERE email IN ({', '.join('?' * len(chunk))})", chunk)
+                registered.update(r[0] for r in cursor.fetchall())
+            # Routing may mirror an owner into a shard's users stub: resolve before this batch writes
+            for email in registered:
+                route(email)
+            for row in rows:
+                if row["owner_email"] not in registered:
+                    # Owner absent from both the snapshot and this vault: the FK would abort the restore
+                    report["chambers_orphaned"] += 1
+                    continue
+                store, _, store_cursor = route(row["owner_email"])
+                store_cursor.execute(store.insert_or_ignore("chambers", chamber_cols), [row[c] for c in chamber_cols])
+                if store_cursor.rowcount > 0:
+                    store_cursor.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (row["owner_email"], row["chamber_name"]))
+                    id_map[(row["firm_id"], row["id"])] = (store_cursor, store_cursor.fetchone()[0])
+                    report["chambers_created"] += 1
+                else:
+                    report["chambers_skipped"] += 1
+            commit_all()
+
+        for batch in _snapshot_batches(path("message_logs"), fmt, batch_rows):
+            columns = [batch.column(name).to_pylist() for name in message_cols + ["firm_id"]]
+            grouped = {}
+            for r in zip(*columns):
+                target = id_map.get((r[-1], r[0]))
+                if target:
+                    grouped.setdefault(id(target[0]), (target[0], []))[1].append((target[1],) + r[1:-1])
+            for store_cursor, rows in grouped.values():
+                store_cursor.executemany(insert_message, rows)
+                report["messages"] += len(rows)
+            commit_all()
+
+        for batch in _snapshot_batches(path("system_telemetry"), fmt, batch_rows):
+            for row in zip(*[batch.column(name).to_pylist() for name in telemetry_cols]):
+                cursor.execute(insert_event, row + row)
+                report["telemetry"] += max(cursor.rowcount, 0)
+            conn.commit()
+    except DB_ERRORS:
+        conn.rollback()
+        for _, store_conn, _ in tenant_conns.values():
+            store_conn.rollback()
+        raise
+    finally:
+        for _, store_conn, _ in tenant_conns.values():
+            if store_conn is not conn:
+                store_conn.close()
+        conn.close()
+    return report
+
+def db_export_snapshot(fmt="parquet", owner_email=None, include_credentials=False):
+    """
+    Exports the live vault into exports/<timestamp>/; returns (snapshot_dir, manifest).
+    Chambers come from the directory vault and every firm shard (with their cold tiers);
+    a single-counsel export reads only that counsel's store.
+    """
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    suffix = f"-{re.sub(r'[^A-Za-z0-9]+', '_', owner_email)}" if owner_email else ""
+    snapshot_dir = os.path.join(SYSTEM_CONFIG["EXPORT_DIRECTORY"], f"snapshot-{stamp}{suffix}")
+    if owner_email:
+        firm_id = resolve_tenant_shard(owner_email)
+        stores = [(firm_id, get_shard_backend(firm_id))]
+    else:
+        stores = [(None, get_persistence_backend())] + list_tenant_shards()
+    manifest = export_snapshot(
+        get_persistence_backend(), snapshot_dir, fmt, owner_email or None, include_credentials=include_credentials,
+        tenant_stores=[(firm_id, store, cold_store_filename(firm_id) if cold_tier_enabled() else None) for firm_id, store in stores]
+    )
+    db_log_event("SYSTEM", "SNAPSHOT_EXPORT", f"{snapshot_dir}: " + ", ".join(f"{t}={m['rows']}" for t, m in manifest["tables"].items()))
+    return snapshot_dir, manifest
+
+def db_import_snapshot(snapshot_dir):
+    """
+    Imports an export into the live vault, each counsel's chambers into their firm shard,
+    and invalidates the chamber registry cache.
+    """
+    report = import_snapshot(
+        get_persistence_backend(), snapshot_dir,
+        tenant_backend_for=lambda email: get_shard_backend(resolve_tenant_shard(email))
+    )
+    get_chamber_registry_cache.clear()
+    db_log_event("SYSTEM", "SNAPSHOT_IMPORT", f"{snapshot_dir}: {report}")
+    return report
+
+def _peak_rss_during(func, *args):
+    """Runs func, sampling process RSS every 10 ms. Returns (result, seconds, peak_rss_delta_mb)."""
+    if psutil is None:
+        started = time.perf_counter()
+        return func(*args), time.perf_counter() - started, None
+    process = psutil.Process()
+    baseline = peak = process.memory_info().rss
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(0.01):
+            peak = max(peak, process.memory_info().rss)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        result = func(*args)
+    finally:
+        elapsed = time.perf_counter() - started
+        done.set()
+        sampler.join()
+    return result, elapsed, round((peak - baseline) / 1048576, 1)
+
+def benchmark_snapshot(message_rows=1_000_000, chamber_count=1000, fmt="parquet"):
+    """
+    Export + import throughput and peak memory on a synthetic vault of message_rows
+    messages, using scratch SQLite files so the live vault is untouched.
+    """
+    scratch = tempfile.mkdtemp(prefix="leviathan-snapshot-")
+    try:
+        source = SQLiteBackend(os.path.join(scratch, "source.db"))
+        target = SQLiteBackend(os.path.join(scratch, "target.db"))
+        init_leviathan_db(source)
+        init_leviathan_db(target)
+
+        conn = source.connect()
+        conn.executemany(
+            "INSERT INTO users (email, full_name, registration_date) VALUES (?, ?, ?)",
+            ((f"counsel{i}@firm.pk", f"Counsel {i}", "2024-01-01 09:00:00") for i in range(50))
+        )
+        conn.executemany(
+            "INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)",
+            ((f"counsel{i % 50}@firm.pk", f"Case {i}", "2024-01-01 09:00:00") for i in range(chamber_count))
+        )
+        body = "Under section 15 of the Karachi Rent Restriction Act, 1953 the Controller may direct eviction of the tenant. "
+        conn.executemany(
+            "INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created, token_count) VALUES (?, ?, ?, ?, ?)",
+            ((i % chamber_count + 1, "assistant" if i % 2 else "user", body[: 40 + i % 70], "2024-01-01 09:00:00", i % 900)
+             for i in range(message_rows))
+        )
+        conn.commit()
+        conn.close()
+        source_mb = os.path.getsize(source.filename) / 1048576
+
+        out_dir = os.path.join(scratch, "export")
+        manifest, export_sec, export_mb = _peak_rss_during(export_snapshot, source, out_dir, fmt)
+        report, import_sec, import_mb = _peak_rss_during(import_snapshot, target, out_dir)
+        export_bytes = sum(os.path.getsize(os.path.join(out_dir, f)) for f in os.listdir(out_dir))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    rows = sum(m["rows"] for m in manifest["tables"].values())
+    return [
+        {"Stage": "Export", "Rows": rows, "Seconds": round(export_sec, 2), "Rows/s": int(rows / export_sec),
+         "Peak RSS Δ (MB)": export_mb, "Size (MB)": round(export_bytes / 1048576, 1), "Source DB (MB)": round(source_mb, 1)},
+        {"Stage": "Import", "Rows": sum(v for k, v in report.items() if k not in ("chambers_skipped", "chambers_orphaned")),
+         "Seconds": round(import_sec, 2), "Rows/s": int(rows / import_sec),
+         "Peak RSS Δ (MB)": import_mb, "Size (MB)": round(export_bytes / 1048576, 1), "Source DB (MB)": round(source_mb, 1)}
+    ]
+
+# ------------------------------------------------------------------------------
+# SECTION 6: CORE ANALYTICAL SERVICES (AI ENGINE & SMTP GATEWAY)
+# ------------------------------------------------------------------------------
+
+@st.cache_resource
+def get_analytical_engine():
+    """Configures the Gemini 1.5 High-Context Model for Legal Analysis."""
+    try:
+        api_key = st.secrets["GOOGLE_API_KEY"]
+        return ChatGoogleGenerativeAI(
+            model="gemini-1.5-flash", 
+            google_api_key=api_key, 
+            temperature=0.0
+        )
+    except Exception as e:
+        st.error(f"AI ENGINE INITIALIZATION ERROR: {e}")
+        return None
+
+def dispatch_legal_brief(target_email, chamber_name, history_data):
+    """Generates and emails a formal legal transcript via SMTP."""
+    try:
+        sender_user = st.secrets["EMAIL_USER"]
+        sender_pass = st.secrets["EMAIL_PASS"].replace(" ", "")
+        
+        msg = MIMEMultipart()
+        msg['From'] = f"Alpha Apex Chambers <{sender_user}>"
+        msg['To'] = target_email
+        msg['Subject'] = f"LEGAL BRIEF: {chamber_name} - {datetime.date.today()}"
+        
+        # Construct Transcript Body
+        body = f"--- ALPHA APEX LEGAL INTELLIGENCE BRIEF ---\n"
+        body += f"CHAMBER: {chamber_name}\n"
+        body += f"STATUS: CONFIDENTIAL PRIVILEGED\n\n"
+        
+        for entry in history_data:
+            role_label = "COUNSEL" if entry['role'] == 'user' else "AI ADVISOR"
+            body += f"[{role_label}]:\n{entry['content']}\n\n"
+            
+        body += "\n--- END OF BRIEF ---\nGenerated by Leviathan v36.5"
+        
+        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+        
+        server = smtplib.SMTP(SYSTEM_CONFIG["SMTP_SERVER"], SYSTEM_CONFIG["SMTP_PORT"])
+        server.starttls()
+        server.login(sender_user, sender_pass)
+        server.send_message(msg)
+        server.quit()
+        return True
+    except Exception as smtp_err:
+        st.error(f"SMTP Dispatch Failure: {smtp_err}")
+        return False
+
+# ------------------------------------------------------------------------------
+# SECTION 6A: LOCAL SPEECH RECOGNITION ENGINE (CPU, CHUNKED)
+# ------------------------------------------------------------------------------
+
+@st.cache_resource
+def get_speech_engine():
+    """
+    Loads the Whisper model once per process (int8 on CPU). None when unavailable.
+    Only a pre-provisioned local model directory (STT_MODEL_PATH) is loaded, never a hub
+    download. Failures are logged, not rendered: st.error inside a cached loader would
+    replay on every page view.
+    """
+    model_path = SYSTEM_CONFIG["STT_MODEL_PATH"]
+    if WhisperModel is None or SYSTEM_CONFIG["STT_ENGINE"] != "local" or not model_path:
+        return None
+    if not os.path.isdir(model_path):
+        print(f"Speech Engine Disabled: model directory '{model_path}' not found")
+        return None
+    try:
+        return WhisperModel(
+            model_path,
+            device="cpu",
+            compute_type="int8",
+            cpu_threads=SYSTEM_CONFIG["STT_CPU_THREADS"],
+            local_files_only=True
+        )
+    except Exception as e:
+        print(f"Speech Engine Initialization Error: {e}")
+        return None
+
+def decode_wav_to_pcm16k(audio_bytes, sample_rate=16000, sample_width=2):
+    """Decodes recorder WAV (or headerless PCM) to mono float32 at Whisper's 16 kHz."""
+    channels = 1
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+            sample_rate = wav.getframerate()
+            sample_width = wav.getsampwidth()
+            channels = wav.getnchannels()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        frames = audio_bytes
+
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[sample_width]
+    pcm = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+    if sample_width == 1:
+        pcm = pcm - 128.0
+    pcm /= float(2 ** (8 * sample_width - 1))
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1)
+
+    if sample_rate != 16000 and len(pcm):
+        target_len = int(len(pcm) * 16000 / sample_rate)
+        pcm = np.interp(
+            np.linspace(0, len(pcm) - 1, target_len),
+            np.arange(len(pcm)),
+            pcm
+        ).astype(np.float32)
+    return pcm
+
+def transcribe_stream(engine, pcm, language_code, vad_filter=True):
+    """
+    Transcribes 16 kHz PCM in fixed windows, yielding the cumulative transcript after each.
+    The tail of the previous window is fed as the initial prompt to keep terminology consistent.
+    """
+    window = int(SYSTEM_CONFIG["STT_CHUNK_SEC"] * 16000)
+    transcript = []
+    for offset in range(0, len(pcm), window):
+        chunk = pcm[offset:offset + window]
+        if len(chunk) < 1600:  # < 0.1 s of trailing audio
+            break
+        segments, _ = engine.transcribe(
+            chunk,
+            language=language_code,
+            beam_size=1,
+            vad_filter=vad_filter,
+            condition_on_previous_text=False,
+            initial_prompt=" ".join(transcript)[-200:] or None
+        )
+        text = " ".join(seg.text.strip() for seg in segments).strip()
+        if text:
+            transcript.append(text)
+        yield " ".join(transcript)
+
+def capture_voice_query(language_name, browser_locale):
+    """
+    Universal mic widget. Uses the local engine when loaded, otherwise the browser/Google
+    recognizer. Partial transcripts are rendered while chunks are decoded.
+    """
+    engine = get_speech_engine()
+    if engine is None:
+        return speech_to_text(
+            language=browser_locale,
+            start_prompt="🎙️",
+            stop_prompt="🛑",
+            key='leviathan_mic',
+            just_once=True
+        )
+
+    audio = mic_recorder(
+        start_prompt="🎙️",
+        stop_prompt="🛑",
+        format="wav",
+        key='leviathan_mic',
+        just_once=True
+    )
+    if not audio:
+        return None
+
+    pcm = decode_wav_to_pcm16k(audio["bytes"], audio["sample_rate"], audio["sample_width"])
+    st.session_state.last_voice_pcm = pcm
+    partial_slot = st.empty()
+    transcript = ""
+    for transcript in transcribe_stream(engine, pcm, STT_LANGUAGE_CODES[language_name]):
+        partial_slot.caption(f"🎙️ {transcript} …")
+    partial_slot.empty()
+    return transcript or None
+
+def benchmark_speech_engine(seconds=30):
+    """
+    Real-time factor (decode wall time / audio duration) per language on this host.
+    Uses the last dictated utterance when present, otherwise synthetic low-level noise.
+    VAD is off so every window reaches the decoder; with it on, noise is discarded
+    and the figure would time the VAD alone.
+    """
+    engine = get_speech_engine()
+    if engine is None:
+        return []
+
+    pcm = st.session_state.get("last_voice_pcm")
+    source = "last dictation"
+    if pcm is None or not len(pcm):
+        pcm = (np.random.default_rng(7).standard_normal(seconds * 16000) * 0.02).astype(np.float32)
+        source = "synthetic noise"
+    audio_sec = len(pcm) / 16000
+
+    results = []
+    for language_name, code in STT_LANGUAGE_CODES.items():
+        started = time.perf_counter()
+        for _ in transcribe_stream(engine, pcm, code, vad_filter=False):
+            pass
+        wall = time.perf_counter() - started
+        results.append({
+            "Language": language_name,
+            "Audio (s)": round(audio_sec, 1),
+            "Decode (s)": round(wall, 2),
+            "RTF": round(wall / audio_sec, 3),
+            "Source": source,
+            "Model": os.path.basename(os.path.normpath(SYSTEM_CONFIG["STT_MODEL_PATH"])),
+            "Host": f"{platform.machine()} / {os.cpu_count()} CPU"
+        })
+    return results
+
+@leviathan_fragment
+def render_speech_benchmark_panel():
+    """Admin console block: local speech engine status and RTF benchmark."""
+    st.subheader("Speech Engine")
+    if get_speech_engine() is None:
+        st.caption("Local speech engine inactive (faster-whisper not installed, STT_ENGINE != 'local', or "
+                   "LEVIATHAN_STT_MODEL_PATH not set to a local model directory); using browser recognizer.")
+        return
+    model_name = os.path.basename(os.path.normpath(SYSTEM_CONFIG["STT_MODEL_PATH"]))
+    st.caption(f"Whisper '{model_name}' · int8 · CPU · {SYSTEM_CONFIG['STT_CHUNK_SEC']} s chunks")
+    if st.button("⏱️ Benchmark Real-Time Factor"):
+        st.table(benchmark_speech_engine())
+
+# ------------------------------------------------------------------------------
+# SECTION 6B: STATUTE STRUCTURE PARSER & SECTION-LEVEL CITATION INDEX
+# ------------------------------------------------------------------------------
+
+# Library files treated as statutes (guides and commentaries are not segmented)
+STATUTE_FILE_PATTERN = re.compile(r"\b(ACT|ORDINANCE|CONSTITUTION)\b", re.IGNORECASE)
+
+# Citation codes that cannot be derived from the title initials
+STATUTE_ALIASES = {
+    "THE CONSTITUTION OF THE ISLAMIC REPUBLIC OF PAKISTAN": {"abbr": "CONST", "year": "1973", "aliases": ["CONSTITUTION"]}
+}
+STATUTE_STOPWORDS = {"THE", "OF", "AND", "IN", "ON", "FOR", "NO", "A", "AN", "TO"}
+
+_PART_RE = re.compile(r"^\s*PART\s+([IVXL]+)\b[\s.:_\-—–]*(.*)$")
+_CHAPTER_RE = re.compile(r"^\s*CHAPTER\s+([IVXL]+|\d+)\b[\s.:_\-—–]*(.*)$")
+_SCHEDULE_RE = re.compile(r"^\s*(?:THE\s+)?(?:(?:FIRST|SECOND|THIRD|FOURTH|FIFTH|SIXTH|SEVENTH|EIGHTH)\s+)?SCHEDULE\b")
+_SECTION_RE = re.compile(r"^\s*(?:\d{1,2}\[)?(\d{1,3}[A-Z]{0,2})\s?\.\s*(?:\d{0,2}\[)?(?:\(1\)\s*)?([A-Z][^\n]*)$")
+_HEADING_END_RE = re.compile(r"_{2,}|\.\s*[―—–]|\.\s+(?=[A-Z(])|\]")
+_XREF_RE = re.compile(r"\b(?:sections?|articles?|s\.)\s*(\d{1,3}[A-Z]{0,2})\b((?:\s*(?:,|and|or|to)\s*\d{1,3}[A-Z]{0,2}\b)*)(?!\s+of\s+the\s+(?!said|this))", re.IGNORECASE)
+
+# Compiled citation matcher: "section 13", "s.13(2)", "Article 199(1)(c) of the Constitution",
+# "section 15 of the Karachi Rent Restriction Act, 1953"
+CITATION_PATTERN = re.compile(
+    r"\b(?P<kind>sections?|secs?\.?|ss?\.|articles?|arts?\.?)\s*(?P<number>\d{1,3}[A-Z]{0,2})\b"
+    r"(?P<subsection>(?:\s*\(\s*[0-9a-z]{1,4}\s*\))*)"
+    r"(?:,?\s+(?:of|under|in)\s+(?:the\s+)?(?P<act>(?:[\w\-\(\)]+\s+){0,8}?(?:Act|Ordinance|Order|Constitution)(?:,?\s*(?P<year>\d{4}))?))?",
+    re.IGNORECASE
+)
+
+def _statute_identity(filename):
+    """Derives (act_code, title, year) from a statute filename, e.g. 'KRRA 1953'."""
+    title = os.path.splitext(filename)[0].strip()
+    override = STATUTE_ALIASES.get(title.upper())
+    if override:
+        return f"{override['abbr']} {override['year']}", title, override["year"]
+    year_match = re.search(r"(1[89]\d\d|20\d\d)", title)
+    year = year_match.group(1) if year_match else ""
+    words = re.findall(r"[A-Za-z]+", re.sub(r"(1[89]\d\d|20\d\d)", " ", title))
+    initials = "".join(
+        w[0].upper() for w in words
+        if w.upper() not in STATUTE_STOPWORDS and not re.fullmatch(r"[IVXL]+", w.upper())
+    )
+    return f"{initials} {year}".strip(), title, year
+
+def _section_sort_key(number):
+    match = re.match(r"(\d+)([A-Z]*)", number)
+    return (int(match.group(1)), match.group(2))
+
+def parse_statute_pdf(path):
+    """
+    Segments a statute into Part / Chapter / Section(Article) nodes with page offsets.
+    Tables of contents and schedules repeat headings, so the kept sections are the
+    heaviest (by body length) strictly increasing run of section numbers in page order.
+    Returns (page_count, nodes); each node carries a document-order 'parent' index.
+    """
+    reader = PdfReader(path)
+    raw_nodes = []
+    current = None
+    in_schedule = False
+
+    for page_no, page in enumerate(reader.pages, start=1):
+        offset = 0
+        for line in (page.extract_text() or "").split("\n"):
+            if _SCHEDULE_RE.match(line):
+                in_schedule = True
+            kind, match = None, None
+            for candidate, pattern in (("part", _PART_RE), ("chapter", _CHAPTER_RE), ("section", _SECTION_RE)):
+                match = pattern.match(line)
+                if match:
+                    kind = candidate
+                    break
+            if kind in ("part", "chapter"):
+                in_schedule = False
+
+            if match and not (in_schedule and kind == "section"):
+                heading = _HEADING_END_RE.split(match.group(2))[0].strip(" .[]-–—:")[:120]
+                current = {"kind": kind, "number": match.group(1), "heading": heading,
+                           "page_start": page_no, "page_end": page_no, "char_offset": offset, "lines": [line]}
+                raw_nodes.append(current)
+            elif current:
+                if current["kind"] != "section" and not current["heading"] and line.strip():
+                    current["heading"] = line.strip(" .-–—_")[:120]
+                current["lines"].append(line)
+                current["page_end"] = page_no
+            offset += len(line) + 1
+
+    # Heaviest increasing chain of section numbers (O(n^2), n = heading candidates)
+    sec_idx = [i for i, n in enumerate(raw_nodes) if n["kind"] == "section"]
+    weights = [len(" ".join(raw_nodes[i]["lines"])) for i in sec_idx]
+    keys = [_section_sort_key(raw_nodes[i]["number"]) for i in sec_idx]
+    best, prev = list(weights), [-1] * len(sec_idx)
+    for j in range(len(sec_idx)):
+        for k in range(j):
+            if keys[k] < keys[j] and best[k] + weights[j] > best[j]:
+                best[j], prev[j] = best[k] + weights[j], k
+    chain = set()
+    if sec_idx:
+        j = max(range(len(sec_idx)), key=best.__getitem__)
+        while j != -1:
+            chain.add(sec_idx[j])
+            j = prev[j]
+    last_section = max(chain) if chain else -1
+
+    # Structural nodes: last occurrence before the final kept section (skips TOC copies)
+    kept_struct = {}
+    part_no = ""
+    for i, node in enumerate(raw_nodes[:last_section + 1]):
+        if node["kind"] == "part":
+            part_no = node["number"]
+            kept_struct[("part", part_no)] = i
+        elif node["kind"] == "chapter":
+            node["number"] = f"{part_no}.{node['number']}" if part_no else node["number"]
+            kept_struct[("chapter", node["number"])] = i
+    keep = sorted(set(kept_struct.values()) | chain)
+
+    nodes, last_part, last_chapter = [], None, None
+    for i in keep:
+        node = raw_nodes[i]
+        if node["kind"] == "part":
+            parent, last_part, last_chapter = None, len(nodes), None
+        elif node["kind"] == "chapter":
+            parent, last_chapter = last_part, len(nodes)
+        else:
+            parent = last_chapter if last_chapter is not None else last_part
+        body = re.sub(r"[ \t]+", " ", "\n".join(node.pop("lines"))).strip()
+        nodes.append(dict(node, body=body[:20000], parent=parent))
+    return len(reader.pages), nodes
+
+def db_index_statute(filename):
+    """Parses one statute from the data repository into statute_nodes / statute_xrefs."""
+    path = os.path.join(SYSTEM_CONFIG["DATA_REPOSITORY"], filename)
+    act_code, title, year = _statute_identity(filename)
+    page_count, nodes = parse_statute_pdf(path)
+    leaf_type = "article" if act_code.startswith("CONST") else "section"
+
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM statute_xrefs WHERE src_id IN (SELECT id FROM statute_nodes WHERE act_code=?)", (act_code,))
+        cursor.execute("DELETE FROM statute_nodes WHERE act_code=?", (act_code,))
+        cursor.execute("DELETE FROM statute_acts WHERE act_code=?", (act_code,))
+        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.execute('''
+            INSERT INTO statute_acts (act_code, title, act_year, filename, page_count, indexed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (act_code, title, year, filename, page_count, ts))
+
+        node_types = [leaf_type if n["kind"] == "section" else n["kind"] for n in nodes]
+        cursor.executemany('''
+            INSERT INTO statute_nodes (act_code, node_type, node_number, heading, page_start, page_end, char_offset, body)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(act_code, t, n["number"], n["heading"], n["page_start"], n["page_end"], n["char_offset"], n["body"])
+              for t, n in zip(node_types, nodes)])
+
+        cursor.execute("SELECT id, node_type, node_number FROM statute_nodes WHERE act_code=?", (act_code,))
+        ids = {(r[1], r[2]): r[0] for r in cursor.fetchall()}
+        node_ids = [ids[(t, n["number"])] for t, n in zip(node_types, nodes)]
+
+        cursor.executemany("UPDATE statute_nodes SET parent_id=? WHERE id=?", [
+            (node_ids[n["parent"]], node_ids[i]) for i, n in enumerate(nodes) if n["parent"] is not None
+        ])
+
+        # Cross-reference graph: "section 11", "sections 6 and 7" inside each body
+        edges = set()
+        for i, node in enumerate(nodes):
+            if node["kind"] != "section":
+                continue
+            for match in _XREF_RE.finditer(node["body"]):
+                for number in [match.group(1)] + re.findall(r"\d{1,3}[A-Z]{0,2}", match.group(2)):
+                    target = ids.get((leaf_type, number))
+                    if target and target != node_ids[i]:
+                        edges.add((node_ids[i], target))
+        cursor.executemany("INSERT INTO statute_xrefs (src_id, dst_id) VALUES (?, ?)", sorted(edges))
+        conn.commit()
+        return len(nodes)
+    except DB_ERRORS as e:
+        st.error(f"Statute Indexing Failure ({filename}): {e}")
+        return 0
+    finally:
+        conn.close()
+
+def db_build_citation_index():
+    """Indexes every statute in the data repository. Returns [(filename, node_count, seconds)]."""
+    repo = SYSTEM_CONFIG["DATA_REPOSITORY"]
+    results = []
+    for filename in sorted(os.listdir(repo)):
+        if filename.lower().endswith(".pdf") and STATUTE_FILE_PATTERN.search(filename):
+            started = time.perf_counter()
+            results.append((filename, db_index_statute(filename), round(time.perf_counter() - started, 2)))
+    get_statute_registry.clear()
+    get_citation_verification_index.clear()
+    db_log_event("SYSTEM", "CITATION_INDEX", f"{len(results)} statutes segmented")
+    return results
+
+@st.cache_resource
+def get_statute_registry():
+    """In-memory act registry for citation resolution (cleared whenever the index is rebuilt)."""
+    conn = get_db_connection()
+    acts = []
+    if not conn:
+        return acts
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT act_code, title, act_year FROM statute_acts ORDER BY act_code")
+        for act_code, title, year in cursor.fetchall():
+            override = STATUTE_ALIASES.get(title.upper(), {})
+            title_words = {w for w in re.findall(r"[A-Z]+", title.upper()) if w not in STATUTE_STOPWORDS}
+            acts.append({
+                "act_code": act_code,
+                "title": title,
+                "year": year,
+                "title_words": title_words,
+                "alias_re": re.compile(r"\b(?:%s)\b" % "|".join(
+                    re.escape(a) for a in [act_code.split()[0]] + override.get("aliases", [])
+                ))
+            })
+    except DB_ERRORS as e:
+        st.error(f"Statute Registry Error: {e}")
+    finally:
+        conn.close()
+    return acts
+
+def resolve_statute(text):
+    """
+    Maps an act mention ('KRRA 1953', 'Karachi Rent Restriction Act', 'Constitution') to an act_code.
+    None when nothing scores high enough or when more than one act shares the top score.
+    """
+    if not text:
+        return None
+    upper = text.upper()
+    words = set(re.findall(r"[A-Z]+", upper))
+    best_codes, best_score = [], 0.0
+    for act in get_statute_registry():
+        if act["alias_re"].search(upper):
+            score = 1.0
+        else:
+            score = len(act["title_words"] & words) / max(1, len(act["title_words"]))
+        if act["year"] and act["year"] in upper:
+            score += 0.5
+        if score > best_score:
+            best_codes, best_score = [act["act_code"]], score
+        elif score == best_score:
+            best_codes.append(act["act_code"])
+    # Several acts tied on the top score: ambiguous, never guessed
+    return best_codes[0] if best_score >= 0.75 and len(best_codes) == 1 else None
+
+# Abbreviation written straight after the citation: "section 151 CPC", "s.15 of the KRRA 1953"
+_TRAILING_ACT_RE = re.compile(r"\s*,?\s*(?:of\s+(?:the\s+)?)?(?P<abbr>[A-Z]{2,8})\b(?:,?\s*(?P<year>\d{4}))?")
+
+_GENERIC_ACT_RE = re.compile(r"(?:(?:this|that|said|same|above|aforesaid)\s+)?(?:Act|Ordinance|Order)", re.IGNORECASE)
+
+def format_citation(act_code, node_type, number):
+    return f"{act_code} {'Art.' if node_type == 'article' else 's.'}{number}"
+
+def extract_citations(text):
+    """
+    Finds section/article citations in free text and resolves their acts.
+    An act named inside or straight after the citation wins, then an abbreviation just
+    before it; bare articles then default to the Constitution, and anything else falls
+    back to the one act the whole text is about (only when exactly one act has the top
+    score). Otherwise the act stays unresolved.
+    Returns dicts: raw, kind, number, act_code (or None), year (as written), span.
+    """
+    found = []
+    document_act = resolve_statute(text)
+    for match in CITATION_PATTERN.finditer(text):
+        kind = "article" if match.group("kind").lower().startswith("art") else "section"
+        named_act, year, end = match.group("act"), match.group("year"), match.end()
+        if not named_act:
+            trailing = _TRAILING_ACT_RE.match(text, end)
+            if trailing:
+                named_act, year, end = trailing.group("abbr"), year or trailing.group("year"), trailing.end()
+        if named_act and not _GENERIC_ACT_RE.fullmatch(named_act.strip()):
+            # An explicitly named act never falls back to context: unknown stays unknown
+            act_code = resolve_statute(named_act if not year or year in named_act else f"{named_act} {year}")
+        else:
+            act_code = resolve_statute(text[max(0, match.start() - 24):match.start()])
+            if not act_code and kind == "article" and not named_act:
+                act_code = next((a["act_code"] for a in get_statute_registry() if a["act_code"].startswith("CONST")), None)
+            act_code = act_code or document_act
+        found.append({
+            "raw": text[match.start():end],
+            "kind": kind,
+            "number": match.group("number").upper(),
+            "act_code": act_code,
+            "year": year,
+            "span": (match.start(), end)
+        })
+    return found
+
+def _statute_node_from_row(row):
+    return {"id": row[0], "act_code": row[1], "node_type": row[2], "node_number": row[3], "heading": row[4],
+            "parent_id": row[5], "page_start": row[6], "page_end": row[7], "char_offset": row[8], "body": row[9],
+            "label": format_citation(row[1], row[2], row[3])}
+
+def db_fetch_statute_node(node_id=None, act_code=None, number=None):
+    """Fetches one node by id, or by (act_code, section/article number) via the citation B-tree index."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        columns = "id, act_code, node_type, node_number, heading, parent_id, page_start, page_end, char_offset, body"
+        if node_id is not None:
+            cursor.execute(f"SELECT {columns} FROM statute_nodes WHERE id=?", (node_id,))
+        else:
+            cursor.execute(f'''
+                SELECT {columns} FROM statute_nodes
+                WHERE act_code=? AND node_type IN ('section', 'article') AND node_number=?
+            ''', (act_code, number))
+        row = cursor.fetchone()
+        return _statute_node_from_row(row) if row else None
+    except DB_ERRORS as e:
+        st.error(f"Statute Lookup Error: {e}")
+        return None
+    finally:
+        conn.close()
+
+def statute_lookup(citation):
+    """Resolves a citation string such as 'KRRA 1953 s.13' or 'Art. 199' to its node."""
+    citations = extract_citations(citation)
+    if not citations:
+        return None
+    target = citations[0]
+    act_code = target["act_code"] or resolve_statute(citation.replace(target["raw"], " "))
+    if not act_code:
+        return None
+    return db_fetch_statute_node(act_code=act_code, number=target["number"])
+
+def db_fetch_statute_links(node_id):
+    """Returns (breadcrumb, cites, cited_by) for a node; link entries are (id, label, heading)."""
+    conn = get_db_connection()
+    breadcrumb, cites, cited_by = [], [], []
+    if not conn:
+        return breadcrumb, cites, cited_by
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT parent_id FROM statute_nodes WHERE id=?", (node_id,))
+        parent = cursor.fetchone()
+        parent_id = parent[0] if parent else None
+        while parent_id:
+            cursor.execute("SELECT node_type, node_number, heading, parent_id FROM statute_nodes WHERE id=?", (parent_id,))
+            row = cursor.fetchone()
+            if not row:
+                break
+            breadcrumb.insert(0, f"{row[0].title()} {row[1].split('.')[-1]} — {row[2]}")
+            parent_id = row[3]
+
+        link_sql = '''
+            SELECT n.id, n.act_code, n.node_type, n.node_number, n.heading
+            FROM statute_xrefs x JOIN statute_nodes n ON n.id = x.{other}
+            WHERE x.{this}=? ORDER BY n.id
+        '''
+        cursor.execute(link_sql.format(other="dst_id", this="src_id"), (node_id,))
+        cites = [(r[0], format_citation(r[1], r[2], r[3]), r[4]) for r in cursor.fetchall()]
+        cursor.execute(link_sql.format(other="src_id", this="dst_id"), (node_id,))
+        cited_by = [(r[0], format_citation(r[1], r[2], r[3]), r[4]) for r in cursor.fetchall()]
+    except DB_ERRORS as e:
+        st.error(f"Cross-Reference Lookup Error: {e}")
+    finally:
+        conn.close()
+    return breadcrumb, cites, cited_by
+
+def build_statute_blocks(query, limit=3, max_chars=1500):
+    """Prompt context: verbatim text of the statute provisions cited in the query, one block each."""
+    blocks, seen = [], set()
+    for citation in extract_citations(query):
+        key = (citation["act_code"], citation["number"])
+        if not citation["act_code"] or key in seen:
+            continue
+        seen.add(key)
+        node = db_fetch_statute_node(act_code=citation["act_code"], number=citation["number"])
+        if node:
+            blocks.append(f"[{node['label']} — {node['heading']} (p.{node['page_start']})]\n{node['body'][:max_chars]}")
+        if len(blocks) >= limit:
+            break
+    return blocks
+
+# ------------------------------------------------------------------------------
+# SECTION 6C: CITATION VERIFICATION PASS (MODEL OUTPUT vs LOCAL CORPUS)
+# ------------------------------------------------------------------------------
+
+@st.cache_resource
+def get_citation_verification_index():
+    """In-memory {act_code: {"year": str, "numbers": frozenset}} built once from statute_nodes."""
+    index = {act["act_code"]: {"year": act["year"], "numbers": set()} for act in get_statute_registry()}
+    conn = get_db_connection()
+    if not conn:
+        return index
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT act_code, node_number FROM statute_nodes WHERE node_type IN ('section', 'article')")
+        for act_code, number in cursor.fetchall():
+            if act_code in index:
+                index[act_code]["numbers"].add(number)
+    except DB_ERRORS as e:
+        st.error(f"Citation Verification Index Error: {e}")
+    finally:
+        conn.close()
+    for entry in index.values():
+        entry["numbers"] = frozenset(entry["numbers"])
+    return index
+
+def verify_citations(text):
+    """
+    Checks every citation in a model answer against the local statute corpus.
+    Statuses: 'verified', 'missing' (act known, provision absent), 'year' (year contradicts
+    the act), 'unknown_act' (act not in the corpus). Memory-only on the hot path.
+    """
+    started = time.perf_counter()
+    index = get_citation_verification_index()
+    results = []
+    for citation in extract_citations(text):
+        entry = index.get(citation["act_code"])
+        if entry is None:
+            status = "unknown_act"
+        elif citation["year"] and entry["year"] and citation["year"] != entry["year"]:
+            status = "year"
+        elif citation["number"] in entry["numbers"]:
+            status = "verified"
+        else:
+            status = "missing"
+        results.append(dict(citation, status=status))
+    return results, (time.perf_counter() - started) * 1000
+
+CITATION_STATUS_MARKERS = {
+    "verified": ":green[✔]",
+    "missing": ":orange[⚠ not found in corpus]",
+    "year": ":orange[⚠ year mismatch]",
+    "unknown_act": ":gray[? act not in library]"
+}
+
+def annotate_citations(text):
+    """Returns (annotated_markdown, results, elapsed_ms) with a marker after each citation."""
+    results, elapsed_ms = verify_citations(text)
+    annotated, cursor_pos = [], 0
+    for result in results:
+        start, end = result["span"]
+        annotated.append(text[cursor_pos:end])
+        annotated.append(f" {CITATION_STATUS_MARKERS[result['status']]}")
+        cursor_pos = end
+    annotated.append(text[cursor_pos:])
+    return "".join(annotated), results, elapsed_ms
+
+def render_verified_response(content):
+    """Renders an assistant answer with inline citation verification markers."""
+    if not get_statute_registry():
+        st.markdown(content)
+        return
+    annotated, results, elapsed_ms = annotate_citations(content)
+    st.markdown(annotated)
+    if results:
+        verified = sum(1 for r in results if r["status"] == "verified")
+        st.caption(f"Citation check: {verified}/{len(results)} verified against local corpus · {elapsed_ms:.1f} ms")
+
+# ------------------------------------------------------------------------------
+# SECTION 6D: LAW LIBRARY INGESTION PIPELINE (SPOOL / DEDUPE / BACKGROUND INDEX)
+# ------------------------------------------------------------------------------
+
+@st.cache_resource
+def get_ingestion_executor():
+    """Process-wide worker pool for page-count / text extraction / statute indexing."""
+    return ThreadPoolExecutor(max_workers=SYSTEM_CONFIG["INGEST_WORKERS"], thread_name_prefix="leviathan-ingest")
+
+def _safe_asset_name(name):
+    """Strips client-side path components and characters the repository listing cannot hold."""
+    name = os.path.basename(name.replace("\\", "/")).strip()
+    name = re.sub(r'[<>:"|?*\x00-\x1f]', "_", name)
+    return name or f"upload-{uuid.uuid4().hex[:8]}.pdf"
+
+def _unique_repo_path(repo_dir, filename):
+    """Same name, different body (e.g. two 'judgment.pdf' uploads): suffix ' (2)', ' (3)', ..."""
+    stem, ext = os.path.splitext(filename)
+    candidate, n = filename, 1
+    while os.path.exists(os.path.join(repo_dir, candidate)):
+        n += 1
+        candidate = f"{stem} ({n}){ext}"
+    return os.path.join(repo_dir, candidate)
+
+def spool_upload(upload, repo_dir, progress=None):
+    """
+    Copies an uploaded file into repo_dir in fixed-size chunks, hashing as it goes.
+    Returns (spool_path, sha256_hex, size_bytes); the spool file is a hidden '.part'
+    until the caller promotes it, so half-written uploads never appear in the library.
+    Chunking bounds the copy, not the upload: st.file_uploader already holds every file
+    of the batch in server memory, which is why batches are capped at INGEST_MAX_BATCH_BYTES.
+    """
+    chunk_bytes = SYSTEM_CONFIG["INGEST_CHUNK_BYTES"]
+    total = getattr(upload, "size", 0) or 0
+    spool_path = os.path.join(repo_dir, f".ingest-{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    written = 0
+    upload.seek(0)
+    with open(spool_path, "wb") as spool:
+        while True:
+            chunk = upload.read(chunk_bytes)
+            if not chunk:
+                break
+            digest.update(chunk)
+            spool.write(chunk)
+            written += len(chunk)
+            if progress and total:
+                progress(min(written / total, 1.0))
+    return spool_path, digest.hexdigest(), written
+
+def extract_asset_metadata(path):
+    """Page count and extracted text length (0 chars ⇒ scanned image, needs OCR)."""
+    reader = PdfReader(path)
+    text_chars = 0
+    for page in reader.pages:
+        text_chars += len(page.extract_text() or "")
+    return len(reader.pages), text_chars
+
+def _ingest_worker(asset_id, filename, backend=None, repo_dir=None):
+    """
+    Background stage: extraction, statute segmentation, status write-back.
+    backend / repo_dir point a benchmark run at a scratch vault; statute segmentation writes
+    the live citation index, so it only runs for the live vault.
+    """
+    path = os.path.join(repo_dir or SYSTEM_CONFIG["DATA_REPOSITORY"], filename)
+    status, page_count, text_chars = "Indexed", None, None
+    try:
+        page_count, text_chars = extract_asset_metadata(path)
+        if not text_chars:
+            status = "Scanned (no text layer)"
+        elif backend is None and STATUTE_FILE_PATTERN.search(filename):
+            node_count = db_index_statute(filename)
+            get_statute_registry.clear()
+            get_citation_verification_index.clear()
+            status = f"Indexed ({node_count} provisions)"
+    except Exception as e:
+        status = f"Failed: {type(e).__name__}"
+        print(f"Ingestion Worker Failure ({filename}): {e}")
+
+    conn = get_db_connection() if backend is None else backend.connect()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE law_assets SET page_count=?, text_chars=?, asset_status=? WHERE id=?",
+                (page_count, text_chars, status, asset_id)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+def db_register_repository_assets():
+    """
+    Hashes repository PDFs that predate the pipeline (copied into data/ by hand) so uploads
+    of the same document dedupe against them; each is queued for extraction once.
+    """
+    repo = SYSTEM_CONFIG["DATA_REPOSITORY"]
+    if not os.path.isdir(repo):
+        return 0
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    backend = get_persistence_backend()
+    queued = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT filename FROM law_assets WHERE content_hash IS NOT NULL")
+        known = {r[0] for r in cursor.fetchall()}
+        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for filename in sorted(os.listdir(repo)):
+            if not filename.lower().endswith(".pdf") or filename in known:
+                continue
+            path = os.path.join(repo, filename)
+            digest = hashlib.sha256()
+            with open(path, "rb") as fh:
+                for chunk in iter(lambda: fh.read(SYSTEM_CONFIG["INGEST_CHUNK_BYTES"]), b""):
+                    digest.update(chunk)
+            cursor.execute(
+                backend.insert_or_ignore("law_assets", ("filename", "filesize_kb", "sync_timestamp", "asset_status", "content_hash")),
+                (filename, round(os.path.getsize(path) / 1024, 2), ts, "Queued", digest.hexdigest())
+            )
+            if cursor.rowcount > 0:
+                cursor.execute("SELECT id FROM law_assets WHERE content_hash=?", (digest.hexdigest(),))
+                queued.append((cursor.fetchone()[0], filename))
+        conn.commit()
+    except DB_ERRORS as e:
+        conn.rollback()
+        print(f"Repository Registration Failure: {e}")
+        return 0
+    finally:
+        conn.close()
+
+    for asset_id, filename in queued:
+        get_ingestion_executor().submit(_ingest_worker, asset_id, filename)
+    return len(queued)
+
+def db_ingest_upload(upload, progress=None, backend=None, repo_dir=None, executor=None):
+    """
+    Foreground stage for one uploaded file: spool + hash, dedupe against law_assets,
+    promote into the repository, register as 'Queued' and hand off to the worker pool.
+    backend / repo_dir / executor default to the live vault, data/ and the shared pool.
+    Returns {"filename", "status": queued|duplicate|failed, "bytes", "detail"}.
+    """
+    repo = repo_dir or SYSTEM_CONFIG["DATA_REPOSITORY"]
+    os.makedirs(repo, exist_ok=True)
+    original = _safe_asset_name(upload.name)
+    report = {"filename": original, "status": "failed", "bytes": 0, "detail": ""}
+
+    spool_path, content_hash, size = spool_upload(upload, repo, progress)
+    report["bytes"] = size
+    conn = get_db_connection() if backend is None else backend.connect()
+    if not conn:
+        os.remove(spool_path)
+        return report
+    final_path = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT filename FROM law_assets WHERE content_hash=?", (content_hash,))
+        existing = cursor.fetchone()
+        if existing:
+            os.remove(spool_path)
+            report.update(status="duplicate", detail=f"same content as {existing[0]}")
+            return report
+
+        final_path = _unique_repo_path(repo, original)
+        os.replace(spool_path, final_path)
+        filename = os.path.basename(final_path)
+        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.execute('''
+            INSERT INTO law_assets (filename, filesize_kb, sync_timestamp, asset_status, content_hash)
+            VALUES (?, ?, ?, 'Queued', ?)
+        ''', (filename, round(size / 1024, 2), ts, content_hash))
+        cursor.execute("SELECT id FROM law_assets WHERE content_hash=?", (content_hash,))
+        asset_id = cursor.fetchone()[0]
+        conn.commit()
+    except DB_INTEGRITY_ERRORS:
+        # Identical body committed by a concurrent session between our SELECT and INSERT
+        conn.rollback()
+        if final_path and os.path.exists(final_path):
+            os.remove(final_path)
+        report.update(status="duplicate", detail="ingested concurrently")
+        return report
+    except (DB_ERRORS + (OSError,)) as e:
+        conn.rollback()
+        for leftover in (spool_path, final_path):
+            if leftover and os.path.exists(leftover):
+                os.remove(leftover)
+        report["detail"] = str(e)
+        return report
+    finally:
+        conn.close()
+
+    (executor or get_ingestion_executor()).submit(_ingest_worker, asset_id, filename, backend, repo_dir)
+    report.update(filename=filename, status="queued")
+    return report
+
+def db_fetch_ingestion_status(limit=50):
+    """Most recent pipeline-registered assets (legacy rows without a hash are excluded)."""
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT filename, filesize_kb, page_count, text_chars, asset_status, sync_timestamp
+            FROM law_assets WHERE content_hash IS NOT NULL ORDER BY id DESC LIMIT ?
+        ''', (limit,))
+        return [
+            {"Filename": r[0], "Size (KB)": r[1], "Pages": r[2], "Text Chars": r[3], "Status": r[4], "Synced": r[5]}
+            for r in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+def _synthetic_judgment_pdf(pages, seed):
+    """Minimal multi-page PDF with a Helvetica text layer (PyPDF2 cannot author text)."""
+    body = (
+        f"IN THE HIGH COURT OF SINDH AT KARACHI. C.P. No. D-{seed} of 2024. "
+        "Under section 15 of the Karachi Rent Restriction Act, 1953 and Article 199 of the Constitution, "
+        "the petitioner seeks eviction of the tenant for default in payment of rent. "
+    )
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_no in range(pages):
+        lines = [f"({body[(page_no + i) % 40:][:90]} {seed}-{page_no}-{i}) Tj T*" for i in range(60)]
+        stream = ("BT /F1 9 Tf 12 TL 40 760 Td\n" + "\n".join(lines) + "\nET").encode("latin-1")
+        kids.append(len(objects) + 1)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects) + 2} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {pages} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + obj + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def benchmark_ingestion(file_count=200, pages_per_file=20, duplicate_every=10):
+    """
+    Throughput of the real pipeline (db_ingest_upload → law_assets dedupe → _ingest_worker)
+    on a synthetic batch. Runs against a scratch vault and repository on a private worker
+    pool, so neither the live library nor its indexing queue is touched or competed with.
+    """
+    batch = []
+    for i in range(file_count):
+        seed = i - 1 if duplicate_every and i and i % duplicate_every == 0 else i
+        upload = io.BytesIO(_synthetic_judgment_pdf(pages_per_file, seed))
+        upload.name, upload.size = f"judgment-{i:04d}.pdf", upload.getbuffer().nbytes
+        batch.append(upload)
+    total_bytes = sum(u.size for u in batch)
+
+    scratch = tempfile.mkdtemp(prefix="leviathan-ingest-")
+    repo_dir = os.path.join(scratch, "data")
+    backend = SQLiteBackend(os.path.join(scratch, "ingest.db"))
+    init_leviathan_db(backend)
+    executor = ThreadPoolExecutor(max_workers=SYSTEM_CONFIG["INGEST_WORKERS"], thread_name_prefix="leviathan-bench")
+    try:
+        started = time.perf_counter()
+        reports = [db_ingest_upload(upload, backend=backend, repo_dir=repo_dir, executor=executor) for upload in batch]
+        spool_sec = time.perf_counter() - started
+        executor.shutdown(wait=True)
+        wall = time.perf_counter() - started
+
+        conn = backend.connect()
+        try:
+            pages, indexed = conn.execute(
+                "SELECT COALESCE(SUM(page_count), 0), COUNT(*) FROM law_assets WHERE asset_status = 'Indexed'"
+            ).fetchone()
+        finally:
+            conn.close()
+    finally:
+        executor.shutdown(wait=True)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "Files": file_count,
+        "Queued": sum(1 for r in reports if r["status"] == "queued"),
+        "Duplicates": sum(1 for r in reports if r["status"] == "duplicate"),
+        "Indexed": indexed,
+        "Pages": pages,
+        "MB": round(total_bytes / 1048576, 1),
+        "Foreground Files/s": round(file_count / spool_sec, 1),
+        "Foreground MB/s": round(total_bytes / 1048576 / spool_sec, 1),
+        "End-to-End Files/s": round(file_count / wall, 1),
+        "End-to-End MB/s": round(total_bytes / 1048576 / wall, 2),
+        "Workers": SYSTEM_CONFIG["INGEST_WORKERS"]
+    }
+
+# ------------------------------------------------------------------------------
+# SECTION 6E: DOCUMENT VIEWER (MMAP BYTE RANGES + PAGE THUMBNAIL CACHE)
+# ------------------------------------------------------------------------------
+
+class MappedPdf(io.RawIOBase):
+    """
+    Read-only stream over a shared mmap of one repository PDF. Each viewer gets its own
+    position, so PDFium / PyPDF2 pull only the byte ranges (xref, page tree, one page's
+    objects) they seek to, and the OS page cache is shared across sessions.
+    """
+
+    def __init__(self, mapping):
+        super().__init__()
+        self._view = memoryview(mapping)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def read(self, size=-1):
+        # PyPDF2 tokenizes with many 1-byte reads; slice the mapping directly
+        end = len(self._view) if size is None or size < 0 else self._pos + size
+        chunk = self._view[self._pos:end].tobytes()
+        self._pos += len(chunk)
+        return chunk
+
+    def readinto(self, buffer):
+        n = max(0, min(len(buffer), len(self._view) - self._pos))
+        memoryview(buffer).cast("B")[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+@st.cache_resource
+def get_pdf_mapping_registry():
+    """
+    Process-wide {path: ((inode, mtime_ns, size), mmap)}; a changed file gets a fresh mapping.
+    PDFium is not thread-safe, so every PDFium call across all sessions holds pdfium_lock.
+    """
+    return {"lock": threading.Lock(), "pdfium_lock": threading.Lock(), "maps": {}}
+
+def _repository_pdf_path(filename):
+    """Resolves a Law Library filename, refusing anything outside the data repository."""
+    repo = os.path.realpath(SYSTEM_CONFIG["DATA_REPOSITORY"])
+    path = os.path.realpath(os.path.join(repo, filename))
+    if os.path.dirname(path) != repo or not path.lower().endswith(".pdf"):
+        raise ValueError(f"Not a repository PDF: {filename}")
+    return path
+
+def _pdf_file_version(path):
+    """(inode, mtime_ns, size) of a file, or None once it is gone."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def prune_pdf_mappings():
+    """Drops mappings of deleted or replaced files; open MappedPdf views keep theirs alive until released."""
+    registry = get_pdf_mapping_registry()
+    with registry["lock"]:
+        stale = [path for path, (version, _) in registry["maps"].items() if _pdf_file_version(path) != version]
+        for path in stale:
+            del registry["maps"][path]
+    return len(stale)
+
+def open_mapped_pdf(filename):
+    """Returns a MappedPdf stream for a repository PDF (mapping created once per file version)."""
+    path = _repository_pdf_path(filename)
+    version = _pdf_file_version(path)
+    if version is None:
+        raise FileNotFoundError(path)
+    registry = get_pdf_mapping_registry()
+    with registry["lock"]:
+        entry = registry["maps"].get(path)
+        if entry is None or entry[0] != version:
+            with open(path, "rb") as fh:
+                # Replaced mappings stay alive until their last MappedPdf view is released
+                entry = (version, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+            registry["maps"][path] = entry
+    return MappedPdf(entry[1])
+
+def open_pdf_download(filename):
+    """
+    Plain file handle on a repository PDF for a deferred st.download_button: Streamlit reads
+    it once on click, straight from disk rather than through a copied mmap view.
+    """
+    return open(_repository_pdf_path(filename), "rb")
+
+def pdf_page_count(filename):
+    """Page count from the page-tree root (PDFium loads pages lazily; PyPDF2 walks the tree)."""
+    if pdfium is not None:
+        with get_pdf_mapping_registry()["pdfium_lock"]:
+            document = pdfium.PdfDocument(open_mapped_pdf(filename), autoclose=True)
+            try:
+                return len(document)
+            finally:
+                document.close()
+    with open_mapped_pdf(filename) as stream:
+        return len(PdfReader(stream).pages)
+
+def extract_pdf_page(filename, page_index):
+    """Single-page PDF (bytes) for download; only that page's objects are read and copied."""
+    out = io.BytesIO()
+    if pdfium is not None:
+        with get_pdf_mapping_registry()["pdfium_lock"]:
+            source = pdfium.PdfDocument(open_mapped_pdf(filename), autoclose=True)
+            target = pdfium.PdfDocument.new()
+            try:
+                target.import_pages(source, [page_index])
+                target.save(out)
+            finally:
+                target.close()
+                source.close()
+        return out.getvalue()
+    with open_mapped_pdf(filename) as stream:
+        writer = PdfWriter()
+        writer.add_page(PdfReader(stream).pages[page_index])
+        writer.write(out)
+    return out.getvalue()
+
+@st.cache_resource
+def get_thumbnail_cache():
+    """
+    On-disk PNG LRU. Recency survives restarts through file mtimes (bumped on every hit);
+    the in-memory OrderedDict mirrors the directory so eviction never rescans it.
+    """
+    directory = SYSTEM_CONFIG["THUMBNAIL_DIRECTORY"]
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".png"):
+            stat = os.stat(os.path.join(directory, name))
+            entries.append((stat.st_mtime, name, stat.st_size))
+    index = OrderedDict((name, size) for _, name, size in sorted(entries))
+    return {"lock": threading.Lock(), "index": index, "bytes": sum(index.values())}
+
+def _thumbnail_store(cache, name, size):
+    """Records a new thumbnail and evicts least-recently-viewed ones beyond the size cap."""
+    cache["index"][name] = size
+    cache["bytes"] += size
+    while cache["bytes"] > SYSTEM_CONFIG["THUMBNAIL_CACHE_BYTES"] and len(cache["index"]) > 1:
+        victim, victim_size = cache["index"].popitem(last=False)
+        cache["bytes"] -= victim_size
+        try:
+            os.remove(os.path.join(SYSTEM_CONFIG["THUMBNAIL_DIRECTORY"], victim))
+        except OSError:
+            pass
+
+def render_page_thumbnail(filename, page_index, scale=None):
+    """
+    PNG path for one page, rendered through PDFium on a cache miss.
+    Returns (png_path, cache_hit, milliseconds); png_path is None without pypdfium2.
+    """
+    started = time.perf_counter()
+    if pdfium is None:
+        return None, False, 0.0
+    scale = scale or SYSTEM_CONFIG["THUMBNAIL_SCALE"]
+    stat = os.stat(_repository_pdf_path(filename))
+    key = f"{filename}|{stat.st_mtime_ns}|{stat.st_size}|{page_index}|{scale}"
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".png"
+    path = os.path.join(SYSTEM_CONFIG["THUMBNAIL_DIRECTORY"], name)
+    cache = get_thumbnail_cache()
+
+    with cache["lock"]:
+        if name in cache["index"] and os.path.exists(path):
+            cache["index"].move_to_end(name)
+            os.utime(path)
+            return path, True, (time.perf_counter() - started) * 1000
+
+    with get_pdf_mapping_registry()["pdfium_lock"]:
+        document = pdfium.PdfDocument(open_mapped_pdf(filename), autoclose=True)
+        try:
+            # Statutes and judgments are monochrome: 8-bit grey PNGs are ~2.5x smaller than RGB
+            image = document[page_index].render(scale=scale, grayscale=True).to_pil()
+        finally:
+            document.close()
+    spool_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    image.save(spool_path, format="PNG")
+    os.replace(spool_path, path)
+
+    with cache["lock"]:
+        if name not in cache["index"]:
+            _thumbnail_store(cache, name, os.path.getsize(path))
+    return path, False, (time.perf_counter() - started) * 1000
+
+def thumbnail_cache_summary():
+    """Returns (thumbnail_count, cache_bytes)."""
+    cache = get_thumbnail_cache()
+    with cache["lock"]:
+        return len(cache["index"]), cache["bytes"]
+
+# ------------------------------------------------------------------------------
+# SECTION 6F: PROMPT TEMPLATE REGISTRY (PRECOMPILED PERSONA / LANGUAGE PREFIXES)
+# ------------------------------------------------------------------------------
+# System prompt = core (IRAC + jurisdiction) → persona → language, compiled once per
+# process. The core is byte-identical for every counsel, so the provider's prefix cache
+# is shared across personas and languages; only the HumanMessage tail varies per turn.
+
+PROMPT_CORE = """You are Alpha Apex, a legal research assistant for advocates practising in Pakistan.
+
+Jurisdiction:
+- Apply the law of the Islamic Republic of Pakistan: the Constitution of 1973, federal and provincial statutes, and the binding precedent of the Supreme Court and the High Courts.
+- Name the forum whose law or practice applies (Supreme Court, a High Court, or a subordinate court) whenever procedure or limitation turns on it.
+- Where foreign authority is persuasive only, say so.
+
+Answer format (IRAC):
+1. Issue: the precise legal question raised by the query.
+2. Rule: the governing provisions and precedent.
+3. Analysis: apply the rule to the facts given, noting assumptions and gaps in the facts.
+4. Conclusion: the answer and the practical next step for counsel.
+
+Citations:
+- Cite provisions as "Section <number> of the <Act title> <year>" or "Article <number> of the Constitution".
+- Quote statute text only from the "Statute Text" supplied with the query; otherwise paraphrase and flag the provision for verification.
+- Never invent case names, citations or section numbers. If unsure, say the point needs verification."""
+
+# Built-in personas (the settings box also accepts a custom persona, compiled on first use)
+PROMPT_PERSONAS = {
+    "Senior High Court Advocate": "Persona: a Senior High Court Advocate. Write as counsel advising a colleague: practical, procedural and candid about weaknesses in the client's position.",
+    "Supreme Court Counsel": "Persona: counsel before the Supreme Court of Pakistan. Emphasise constitutional questions, leave to appeal, and the weight of binding precedent.",
+    "Criminal Defence Counsel": "Persona: criminal defence counsel. Focus on the accused's rights, bail, evidence and procedural safeguards under criminal procedure.",
+    "Corporate Legal Advisor": "Persona: an in-house corporate legal advisor. Focus on compliance, regulatory exposure and contractual risk, in plain business language.",
+    "Legal Research Clerk": "Persona: a research clerk preparing a bench memo. Be neutral, and set out both sides before the conclusion."
+}
+
+PROMPT_LANGUAGES = {
+    "English": "Language: respond in English.",
+    "Urdu": "Language: respond in Urdu (Nastaliq script). Keep Act titles, section / article numbers and case citations in English as officially reported.",
+    "Sindhi": "Language: respond in Sindhi (Perso-Arabic script). Keep Act titles, section / article numbers and case citations in English as officially reported.",
+    "Punjabi": "Language: respond in Punjabi (Shahmukhi script). Keep Act titles, section / article numbers and case citations in English as officially reported."
+}
+
+PROMPT_USER_TEMPLATE = "{context}Query: {query}"
+PROMPT_CONTEXT_TEMPLATE = "Statute Text:\n{blocks}\n\n"
+
+def estimate_tokens(text):
+    """
+    Offline, conservative token estimate (the Gemini tokenizer is only reachable over the API):
+    ~4 chars/token for Latin script, ~2 for Urdu / Sindhi / Shahmukhi.
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return -(-(len(text) - non_ascii) // 4) - (-non_ascii // 2)
+
+PROMPT_USER_STATIC_TOKENS = estimate_tokens(PROMPT_USER_TEMPLATE.format(context="", query=""))
+PROMPT_CONTEXT_STATIC_TOKENS = estimate_tokens(PROMPT_CONTEXT_TEMPLATE.format(blocks=""))
+
+@functools.lru_cache(maxsize=64)
+def compile_prompt_template(persona, language):
+    """One immutable template: the shared SystemMessage plus its precomputed token count."""
+    persona_block = PROMPT_PERSONAS.get(persona) or f"Persona: {persona}. Stay within that role throughout."
+    system_text = "\n\n".join([PROMPT_CORE, persona_block, PROMPT_LANGUAGES[language]])
+    return {
+        "persona": persona,
+        "language": language,
+        "system": SystemMessage(content=system_text),
+        "system_tokens": estimate_tokens(system_text)
+    }
+
+@st.cache_resource
+def get_prompt_registry():
+    """Every built-in persona × interface language, compiled once per server process."""
+    return {
+        (persona, language): compile_prompt_template(persona, language)
+        for persona in PROMPT_PERSONAS for language in PROMPT_LANGUAGES
+    }
+
+def get_prompt_template(persona, language):
+    persona = (persona or "").strip() or "Senior High Court Advocate"
+    language = language if language in PROMPT_LANGUAGES else "English"
+    return get_prompt_registry().get((persona, language)) or compile_prompt_template(persona, language)
+
+def build_prompt_messages(persona, language, query, statute_blocks=()):
+    """
+    [precompiled SystemMessage, HumanMessage tail] for one consultation turn.
+    The budget check counts only the tail: statute blocks are dropped from the end once
+    they no longer fit; the counsel's query itself is never cut.
+    Returns (messages, estimated input tokens).
+    """
+    template = get_prompt_template(persona, language)
+    used = template["system_tokens"] + PROMPT_USER_STATIC_TOKENS + estimate_tokens(query)
+    kept = []
+    for block in statute_blocks:
+        cost = estimate_tokens(block) + 1 + (0 if kept else PROMPT_CONTEXT_STATIC_TOKENS)
+        if used + cost > SYSTEM_CONFIG["PROMPT_TOKEN_BUDGET"]:
+            break
+        kept.append(block)
+        used += cost
+
+    context = PROMPT_CONTEXT_TEMPLATE.format(blocks="\n\n".join(kept)) if kept else ""
+    return [template["system"], HumanMessage(content=PROMPT_USER_TEMPLATE.format(context=context, query=query))], used
+
+# Compile the Prompt Registry on Load
+get_prompt_registry()
+
+# ------------------------------------------------------------------------------
+# SECTION 7: GOOGLE OAUTH CALLBACK & AUTO-REGISTRATION HANDLER
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# SECTION 7: GOOGLE OAUTH CALLBACK & AUTO-REGISTRATION HANDLER
+# ------------------------------------------------------------------------------
+
+def handle_google_callback():
+    params = st.query_params
+    if "code" in params:
+        st.session_state.logged_in = True
         st.query_params.clear()
         st.rerun()
 
@@ -575,195 +3419,533 @@ def render_google_sign_in():
 # SECTION 8: UI LAYOUT - SOVEREIGN CHAMBERS (MAIN WORKSTATION)
 # ------------------------------------------------------------------------------
 
-def render_main_interface():
+@leviathan_fragment
+def render_chamber_manager():
     """
-    Constructs the Primary AI Workstation UI.
-    Includes Sidebar navigation, Case management, Law Library (Local Sync), and the Chat engine.
+    Sidebar case-file navigator: chamber selection, provisioning, rename and archive.
+    Renders entirely from the chamber registry cache; form and expander interactions
+    rerun only this fragment.
     """
-    apply_leviathan_shaders()
-    
-    # Language Context Map
-    lexicon = {
-        "English": "en-US", 
-        "Urdu": "ur-PK", 
-        "Sindhi": "sd-PK", 
-        "Punjabi": "pa-PK"
-    }
+    email = st.session_state.user_email
 
-    # --- SIDEBAR DESIGN ---
-    with st.sidebar:
-        st.markdown("<div class='logo-text'>⚖️ ALPHA APEX</div>", unsafe_allow_html=True)
-        st.markdown("<div class='sub-logo-text'>Leviathan Suite v36.5</div>", unsafe_allow_html=True)
-        
-        st.markdown("**Sovereign Navigation Hub**")
-        nav_mode = st.radio(
-            "Navigation", 
-            ["Chambers", "Law Library", "System Admin"], 
-            label_visibility="collapsed"
-        )
-        
-        st.divider()
-        
-        if nav_mode == "Chambers":
-            st.markdown("**Active Case Files**")
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT chamber_name FROM chambers WHERE owner_email=?", (st.session_state.user_email,))
-            user_chambers = [r[0] for r in cursor.fetchall()]
-            conn.close()
-            
-            if not user_chambers:
-                user_chambers = ["General Litigation Chamber"]
-                
-            st.session_state.active_ch = st.radio(
-                "Select Case", 
-                user_chambers, 
-                label_visibility="collapsed"
-            )
-            
-            # Action Cluster
-            col_add, col_mail = st.columns(2)
-            with col_add:
-                if st.button("➕ New"): st.session_state.trigger_new_ch = True
-            with col_mail:
-                if st.button("📧 Brief"):
-                    hist = db_fetch_chamber_history(st.session_state.user_email, st.session_state.active_ch)
-                    if dispatch_legal_brief(st.session_state.user_email, st.session_state.active_ch, hist):
-                        st.success("Brief Dispatched")
+    st.markdown("**Active Case Files**")
+    user_chambers = db_fetch_user_chambers(email)
 
-        st.divider()
-        
-        with st.expander("⚙️ Settings & help"):
-            st.caption("AI Configuration")
-            sys_persona = st.text_input("Assistant Persona", value="Senior High Court Advocate")
-            sys_lang = st.selectbox("Interface Language", list(lexicon.keys()))
-            
-            st.divider()
-            if st.button("🚪 Secure Logout", use_container_width=True):
-                st.session_state.logged_in = False
+    if not user_chambers:
+        user_chambers = ["General Litigation Chamber"]
+
+    if st.session_state.active_ch not in user_chambers:
+        st.session_state.active_ch = user_chambers[0]
+    selected_ch = st.radio(
+        "Select Case",
+        user_chambers,
+        index=user_chambers.index(st.session_state.active_ch),
+        label_visibility="collapsed"
+    )
+    if selected_ch != st.session_state.active_ch:
+        # Case switch changes the page header and transcript: full rerun
+        st.session_state.active_ch = selected_ch
+        st.rerun()
+
+    # Action Cluster
+    col_add, col_mail = st.columns(2)
+    with col_add:
+        if st.button("➕ New"): st.session_state.trigger_new_ch = True
+    with col_mail:
+        if st.button("📧 Brief"):
+            hist = db_fetch_chamber_history(email, st.session_state.active_ch)
+            if dispatch_legal_brief(email, st.session_state.active_ch, hist):
+                st.success("Brief Dispatched")
+
+    # New Chamber Provisioning Form
+    if st.session_state.get("trigger_new_ch"):
+        with st.form("new_chamber_form", clear_on_submit=True):
+            new_name = st.text_input("Case Title")
+            new_type = st.selectbox("Chamber Type", CHAMBER_TYPES)
+            col_ok, col_cancel = st.columns(2)
+            with col_ok:
+                submit_new = st.form_submit_button("Create")
+            with col_cancel:
+                cancel_new = st.form_submit_button("Cancel")
+
+        if submit_new:
+            if db_create_chamber(email, new_name, new_type):
+                st.session_state.active_ch = new_name.strip()
+                st.session_state.trigger_new_ch = False
                 st.rerun()
+            else:
+                st.error("PROVISIONING FAILED: Case title is empty or already exists.")
+        if cancel_new:
+            st.session_state.trigger_new_ch = False
+            st.rerun()
 
-    # --- MAIN CONTENT AREA ---
-    if nav_mode == "Chambers":
-        st.header(f"💼 CASE: {st.session_state.active_ch}")
-        st.caption("Strategic Litigation Environment | End-to-End Encryption Verified")
-        
-        # History Canvas
-        history_canvas = st.container()
-        with history_canvas:
-            chat_history = db_fetch_chamber_history(st.session_state.user_email, st.session_state.active_ch)
-            for msg in chat_history:
-                with st.chat_message(msg["role"]):
-                    st.write(msg["content"])
+    # Case File Maintenance
+    with st.expander("🗂️ Manage Case File"):
+        rename_to = st.text_input("Rename Case", value=st.session_state.active_ch)
+        if st.button("✏️ Rename", use_container_width=True):
+            if db_rename_chamber(email, st.session_state.active_ch, rename_to):
+                st.session_state.active_ch = rename_to.strip()
+                st.rerun()
+            else:
+                st.error("RENAME FAILED: Title is unchanged, empty or already in use.")
+
+        if st.button("🗄️ Archive Case", use_container_width=True):
+            if len(user_chambers) <= 1:
+                st.warning("At least one active chamber must remain open.")
+            elif db_set_chamber_archived(email, st.session_state.active_ch, archived=True):
+                st.session_state.active_ch = next(n for n in user_chambers if n != st.session_state.active_ch)
+                st.rerun()
+
+        archived_chambers = db_fetch_user_chambers(email, archived=True)
+        if archived_chambers:
+            st.caption(f"Archived Case Files ({len(archived_chambers)})")
+            restore_target = st.selectbox("Archived Cases", archived_chambers, label_visibility="collapsed")
+            if st.button("📜 Review Transcript", use_container_width=True):
+                render_archived_transcript(email, restore_target)
+            if st.button("♻️ Restore Case", use_container_width=True):
+                if db_set_chamber_archived(email, restore_target, archived=False):
+                    st.session_state.active_ch = restore_target
+                    st.rerun()
+
+@st.dialog("Archived Case Transcript", width="large")
+def render_archived_transcript(email, chamber_name):
+    """Read-only view of an archived chamber, rehydrated from the cold tier on open."""
+    st.markdown(f"**{chamber_name}**")
+    for msg in db_fetch_chamber_history(email, chamber_name):
+        with st.chat_message(msg["role"]):
+            st.write(msg["content"])
+
+@leviathan_fragment
+def render_storage_tiering_panel():
+    """Admin console block: hot/cold footprint and on-demand archive tiering."""
+    st.subheader("Storage Tiering")
+    if not cold_tier_enabled():
+        st.caption("PostgreSQL backend: transcripts stay in the shared database so every replica serves them; "
+                   "archive tiering is disabled.")
+        return
+    summary = cold_store_summary()
+    hot_kb = 0
+    conn = get_db_connection()
+    if conn:
+        try:
+            hot_kb = get_persistence_backend().space_profile(conn)[0] / 1024
+        finally:
+            conn.close()
+
+    col_hot, col_cold, col_ratio = st.columns(3)
+    with col_hot:
+        st.metric("Hot DB (KB)", round(hot_kb, 1))
+    with col_cold:
+        st.metric("Cold Transcripts", f"{summary['chambers']} / {summary['messages']} msgs")
+    with col_ratio:
+        ratio = summary["raw_bytes"] / summary["stored_bytes"] if summary["stored_bytes"] else 0
+        st.metric("Compression Ratio", f"{ratio:.1f}x")
+
+    if st.button("🧊 Move Archived Chambers to Cold Storage"):
+        report = db_tier_archived_chambers()
+        st.success(
+            f"Tiered {report['messages']} messages from {report['chambers']} chambers | "
+            f"{report['raw_bytes'] // 1024} KB → {report['stored_bytes'] // 1024} KB compressed | "
+            f"{report['reclaimed_bytes'] // 1024} KB of hot pages reclaimed"
+        )
+
+def tenant_shard_summary():
+    """Per-firm counsel, chamber, message and query counts and shard footprint for the admin console."""
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT firm_id, COUNT(*) FROM users WHERE firm_id IS NOT NULL GROUP BY firm_id")
+        members = dict(cursor.fetchall())
+    finally:
+        conn.close()
+
+    rows = []
+    for firm_id, backend in list_tenant_shards():
+        shard = backend.connect()
+        try:
+            chambers = shard.execute("SELECT COUNT(*) FROM chambers").fetchone()[0]
+            messages = shard.execute("SELECT COUNT(*) FROM message_logs").fetchone()[0]
+            queries = shard.execute("SELECT COALESCE(SUM(total_queries), 0) FROM users").fetchone()[0]
+            shard_kb = backend.space_profile(shard)[0] / 1024
+        finally:
+            shard.close()
+        rows.append({"Firm": firm_id, "Counsel": members.get(firm_id, 0), "Chambers": chambers,
+                     "Messages": messages, "Queries": queries, "Shard (KB)": round(shard_kb, 1), "File": backend.filename})
+    return rows
+
+@leviathan_fragment
+def render_tenant_shard_panel():
+    """Admin console block: firm shard directory and write-scaling load test."""
+    st.subheader("Firm Shards")
+    if get_persistence_backend().name != "sqlite":
+        st.caption("PostgreSQL backend: every firm shares the server; row-level locking replaces per-firm shards.")
+        return
+    shards = tenant_shard_summary()
+    if shards:
+        st.table(shards)
+    else:
+        st.caption("No firms registered yet; all counsel share the directory vault.")
+
+    col_t, col_w = st.columns(2)
+    with col_t:
+        max_tenants = st.select_slider("Max tenants", [1, 2, 4, 8, 16], value=8)
+    with col_w:
+        writes = st.number_input("Commits per tenant", 100, 20000, 1000, step=100)
+    if st.button("⏱️ Run Tenant Write Load Test"):
+        counts = [n for n in (1, 2, 4, 8, 16) if n <= max_tenants]
+        with st.spinner("Committing consultations into shared and sharded scratch vaults..."):
+            st.table(benchmark_tenant_writes(counts, int(writes)))
+
+@leviathan_fragment
+def render_snapshot_panel():
+    """Admin console block: consistent Parquet / Arrow export, import, and throughput benchmark."""
+    st.subheader("Bulk Export & Import")
+    col_fmt, col_owner = st.columns(2)
+    with col_fmt:
+        fmt = st.radio("Format", list(SNAPSHOT_EXTENSIONS), horizontal=True, key="snapshot_fmt")
+    with col_owner:
+        owner_email = st.text_input("Single counsel (optional)", placeholder="counsel@firm.pk", key="snapshot_owner")
+    include_credentials = st.checkbox(
+        "Include vault keys (restore / migration only)", key="snapshot_credentials",
+        help="Without vault keys, restored counsel sign up again with the same email to set a new key; their chambers are kept."
+    )
+    if st.button("📦 Export Snapshot"):
+        with st.spinner("Streaming chambers, transcripts and telemetry..."):
+            snapshot_dir, manifest = db_export_snapshot(fmt, owner_email.strip(), include_credentials)
+        st.success(f"Snapshot written to {snapshot_dir}")
+        st.table([{"Table": t, "File": m["file"], "Rows": m["rows"]} for t, m in manifest["tables"].items()])
+
+    export_root = SYSTEM_CONFIG["EXPORT_DIRECTORY"]
+    snapshots = sorted(
+        (d for d in os.listdir(export_root) if os.path.exists(os.path.join(export_root, d, "manifest.json"))),
+        reverse=True
+    ) if os.path.isdir(export_root) else []
+    if snapshots:
+        col_pick, col_go = st.columns([3, 1], vertical_alignment="bottom")
+        with col_pick:
+            selected = st.selectbox("Snapshot to import", snapshots, key="snapshot_import")
+        with col_go:
+            if st.button("📥 Import"):
+                with st.spinner("Restoring snapshot..."):
+                    report = db_import_snapshot(os.path.join(export_root, selected))
+                st.success(
+                    f"{report['users']} counsel · {report['chambers_created']} chambers created ({report['chambers_skipped']} already present, "
+                    f"{report['chambers_orphaned']} without a registered owner skipped) · "
+                    f"{report['messages']} messages · {report['telemetry']} telemetry events"
+                )
+
+    bench_rows = st.number_input("Benchmark messages", 100_000, 10_000_000, 1_000_000, step=500_000, key="snapshot_bench_rows")
+    if st.button("⏱️ Benchmark Export / Import"):
+        with st.spinner("Building synthetic vault and round-tripping it..."):
+            st.table(benchmark_snapshot(int(bench_rows), fmt=fmt))
+
+@leviathan_fragment
+def render_citation_panel(chat_history):
+    """
+    Clickable citation panel for the active chamber: every resolved section/article cited
+    in the transcript, with the selected provision's text, location and cross-references.
+    """
+    citations, seen = [], set()
+    for msg in chat_history:
+        for citation in extract_citations(msg["content"]):
+            key = (citation["act_code"], citation["number"])
+            if citation["act_code"] and key not in seen:
+                seen.add(key)
+                citations.append(citation)
+
+    with st.expander(f"📑 Citation Panel ({len(citations)})"):
+        if not get_statute_registry():
+            st.caption("Citation index is empty. Build it from the Law Library.")
+            return
+
+        lookup = st.text_input("Look up a provision", placeholder="e.g. KRRA 1953 s.15 or Art. 199")
+        if lookup:
+            node = statute_lookup(lookup)
+            if node:
+                st.session_state.citation_focus = node["id"]
+            else:
+                st.caption("No matching provision in the citation index.")
+
+        columns = st.columns(4)
+        for i, citation in enumerate(citations[:24]):
+            label = format_citation(citation["act_code"], citation["kind"], citation["number"])
+            with columns[i % 4]:
+                if st.button(label, key=f"cite_{citation['act_code']}_{citation['number']}"):
+                    node = db_fetch_statute_node(act_code=citation["act_code"], number=citation["number"])
+                    st.session_state.citation_focus = node["id"] if node else None
+
+        focus = st.session_state.get("citation_focus")
+        node = db_fetch_statute_node(node_id=focus) if focus else None
+        if node:
+            breadcrumb, cites, cited_by = db_fetch_statute_links(node["id"])
+            st.markdown(f"**{node['label']} — {node['heading']}**")
+            st.caption(" → ".join([node["act_code"]] + breadcrumb) + f" | pages {node['page_start']}–{node['page_end']}")
+            st.text(node["body"][:3000])
+            for title, links in (("Cites", cites), ("Cited by", cited_by)):
+                if links:
+                    st.caption(title)
+                    link_cols = st.columns(4)
+                    for i, (link_id, link_label, link_heading) in enumerate(links[:12]):
+                        with link_cols[i % 4]:
+                            if st.button(link_label, key=f"xref_{title}_{link_id}", help=link_heading):
+                                st.session_state.citation_focus = link_id
+                                rerun_fragment()
+
+@leviathan_fragment
+def render_citation_index_panel():
+    """Law Library block: statute segmentation status and index rebuild."""
+    st.markdown("**Section-Level Citation Index**")
+    acts = get_statute_registry()
+    if acts:
+        st.caption(", ".join(a["act_code"] for a in acts))
+    else:
+        st.caption("No statutes segmented yet.")
+    if st.button("📑 Build Citation Index"):
+        with st.spinner("Segmenting statutes into Parts, Chapters and Sections..."):
+            results = db_build_citation_index()
+        st.table([{"Statute": f, "Nodes": n, "Seconds": t} for f, n, t in results])
+
+@leviathan_fragment
+def render_ingestion_panel():
+    """Law Library block: bulk upload → spool/dedupe → background extraction queue."""
+    if "ingest_epoch" not in st.session_state:
+        st.session_state.ingest_epoch = 0
+    uploaded_files = st.file_uploader(
+        "Upload Legal Precedents (PDF)", accept_multiple_files=True, type=['pdf'],
+        key=f"ingest_uploader_{st.session_state.ingest_epoch}",
+        help=f"Files are held in server memory until ingested; batches are limited to {SYSTEM_CONFIG['INGEST_MAX_BATCH_BYTES'] // 1048576} MB."
+    )
+    batch_bytes = sum(f.size for f in uploaded_files or [])
+    if batch_bytes > SYSTEM_CONFIG["INGEST_MAX_BATCH_BYTES"]:
+        # Uploaded files sit in server memory until ingested: keep each batch bounded
+        st.warning(
+            f"This batch holds {batch_bytes / 1048576:.0f} MB in server memory; the limit is "
+            f"{SYSTEM_CONFIG['INGEST_MAX_BATCH_BYTES'] / 1048576:.0f} MB per batch. Remove some files and ingest the rest separately."
+        )
+    elif uploaded_files and st.button(f"📥 Ingest {len(uploaded_files)} File(s)"):
+        started = time.perf_counter()
+        db_register_repository_assets()
+        reports = []
+        for f in uploaded_files:
+            bar = st.progress(0.0, text=f"Spooling {f.name}")
+            report = db_ingest_upload(f, progress=lambda frac, bar=bar, name=f.name: bar.progress(frac, text=f"Spooling {name}"))
+            bar.progress(1.0, text=f"{report['filename']}: {report['status']}")
+            reports.append(report)
+        elapsed = time.perf_counter() - started
+        queued = sum(1 for r in reports if r["status"] == "queued")
+        db_log_event(st.session_state.user_email, "LIBRARY_INGEST", f"{queued}/{len(reports)} queued")
+        st.session_state.ingest_report = (reports, elapsed)
+        # Fresh uploader key releases the uploaded buffers held in widget state
+        st.session_state.ingest_epoch += 1
+        rerun_fragment()
+
+    if st.session_state.get("ingest_report"):
+        reports, elapsed = st.session_state.ingest_report
+        total_mb = sum(r["bytes"] for r in reports) / 1048576
+        counts = {s: sum(1 for r in reports if r["status"] == s) for s in ("queued", "duplicate", "failed")}
+        st.success(
+            f"{counts['queued']} queued · {counts['duplicate']} duplicates skipped · {counts['failed']} failed | "
+            f"{len(reports) / max(elapsed, 1e-6):.1f} files/s · {total_mb / max(elapsed, 1e-6):.1f} MB/s"
+        )
+        for r in reports:
+            if r["status"] != "queued":
+                st.caption(f"{r['filename']}: {r['status']} {r['detail']}")
+
+    status_rows = db_fetch_ingestion_status()
+    if status_rows:
+        pending = sum(1 for r in status_rows if r["Status"] == "Queued")
+        col_q, col_r = st.columns([3, 1])
+        with col_q:
+            st.caption(f"Extraction queue: {pending} pending of {len(status_rows)} recent uploads")
+        with col_r:
+            if st.button("🔄 Refresh Queue"):
+                rerun_fragment()
+        st.dataframe(status_rows, use_container_width=True, hide_index=True)
+
+@leviathan_fragment
+def render_document_viewer():
+    """Law Library block: single-page preview of any repository PDF (only that page is read)."""
+    st.markdown("**Document Viewer**")
+    repo = SYSTEM_CONFIG["DATA_REPOSITORY"]
+    documents = sorted(f for f in os.listdir(repo) if f.lower().endswith(".pdf")) if os.path.isdir(repo) else []
+    if not documents:
+        st.caption("No documents to preview.")
+        return
+
+    prune_pdf_mappings()
+    col_doc, col_page = st.columns([3, 1])
+    with col_doc:
+        selected_doc = st.selectbox("Document", documents, key="viewer_doc")
+    try:
+        page_count = pdf_page_count(selected_doc)
+    except Exception as e:
+        st.error(f"Unreadable PDF ({selected_doc}): {e}")
+        return
+    with col_page:
+        page_no = st.number_input(f"Page (of {page_count})", 1, page_count, 1, key=f"viewer_page_{selected_doc}")
+
+    png_path, cache_hit, elapsed_ms = render_page_thumbnail(selected_doc, page_no - 1)
+    if png_path:
+        st.image(png_path, use_container_width=True)
+        thumbs, cache_bytes = thumbnail_cache_summary()
+        st.caption(
+            f"Page {page_no}/{page_count} · {'cache hit' if cache_hit else 'rendered'} in {elapsed_ms:.1f} ms · "
+            f"thumbnail cache {thumbs} pages / {cache_bytes / 1048576:.1f} of "
+            f"{SYSTEM_CONFIG['THUMBNAIL_CACHE_BYTES'] // 1048576} MB"
+        )
+    else:
+        st.caption("Page previews need pypdfium2; showing the page's text layer instead.")
+        with open_mapped_pdf(selected_doc) as stream:
+            st.text(PdfReader(stream).pages[page_no - 1].extract_text() or "(no text layer)")
+
+    # Deferred downloads: the bytes are produced only when a button is clicked, not on every rerun
+    col_page_dl, col_doc_dl = st.columns(2)
+    with col_page_dl:
+        st.download_button(
+            f"⬇️ Download Page {page_no} (PDF)",
+            data=functools.partial(extract_pdf_page, selected_doc, page_no - 1),
+            file_name=f"{os.path.splitext(selected_doc)[0]} - p{page_no}.pdf",
+            mime="application/pdf",
+            on_click="ignore",
+            key="viewer_download"
+        )
+    with col_doc_dl:
+        # Streamlit buffers a download in server memory, so very large documents are not offered
+        doc_bytes = os.path.getsize(_repository_pdf_path(selected_doc))
+        too_large = doc_bytes > SYSTEM_CONFIG["VIEWER_DOWNLOAD_MAX_BYTES"]
+        st.download_button(
+            "⬇️ Download Document (PDF)",
+            data=functools.partial(open_pdf_download, selected_doc),
+            file_name=selected_doc,
+            mime="application/pdf",
+            on_click="ignore",
+            disabled=too_large,
+            help=f"Documents over {SYSTEM_CONFIG['VIEWER_DOWNLOAD_MAX_BYTES'] // 1048576} MB are not offered for download here." if too_large else None,
+            key="viewer_download_full"
+        )
+
+@leviathan_fragment
+def render_ingestion_benchmark_panel():
+    """Admin console block: ingestion throughput on a synthetic judgment batch."""
+    st.subheader("Ingestion Throughput")
+    col_f, col_p = st.columns(2)
+    with col_f:
+        file_count = st.number_input("Synthetic files", 10, 2000, 200, step=50)
+    with col_p:
+        pages = st.number_input("Pages per file", 1, 500, 20, step=10)
+    if st.button("⏱️ Benchmark Ingestion"):
+        with st.spinner("Generating and ingesting synthetic judgments..."):
+            st.table([benchmark_ingestion(int(file_count), int(pages))])
+
+@leviathan_fragment
+def render_workspace_settings():
+    """Sidebar AI configuration; persona/language edits rerun only this block."""
+    with st.expander("⚙️ Settings & help"):
+        st.caption("AI Configuration")
+        st.selectbox("Assistant Persona", list(PROMPT_PERSONAS), key="sys_persona", accept_new_options=True,
+                     help="Pick a built-in persona or type your own.")
+        st.selectbox("Interface Language", list(INTERFACE_LEXICON.keys()), key="sys_lang")
+        template = get_prompt_template(st.session_state.sys_persona, st.session_state.sys_lang)
+        st.caption(f"Precompiled system prompt: {template['system_tokens']} tokens · "
+                   f"turn budget {SYSTEM_CONFIG['PROMPT_TOKEN_BUDGET']}")
         
-        # --- FIXED MIC ALIGNMENT LOGIC ---
-        st.markdown("""
-            <style>
-                .stChatInputContainer { padding-right: 60px !important; }
-                .mic-container { position: fixed; bottom: 38px; right: 4.5%; z-index: 999999; }
-                .mic-container button { background: transparent !important; border: none !important; font-size: 22px !important; box-shadow: none !important; }
-            </style>
-        """, unsafe_allow_html=True)
+        st.divider()
+        if st.button("🚪 Secure Logout", use_container_width=True):
+            st.session_state.logged_in = False
+            st.rerun()
 
-        # 1. Render Chat Input
+@leviathan_fragment
+def render_chat_workspace():
+    """
+    Chambers transcript, citation panel and query bar. A typed query or mic event
+    reruns only this block; the sidebar, shaders and page chrome stay as rendered.
+    """
+    sys_persona = st.session_state.get("sys_persona", "Senior High Court Advocate")
+    sys_lang = st.session_state.get("sys_lang", "English")
+    
+    # History Canvas (scrolls independently; the query bar stays beneath it)
+    history_canvas = st.container(height=SYSTEM_CONFIG["CHAT_CANVAS_HEIGHT"])
+    with history_canvas:
+        chat_history = db_fetch_chamber_history(st.session_state.user_email, st.session_state.active_ch)
+        for msg in chat_history:
+            with st.chat_message(msg["role"]):
+                if msg["role"] == "assistant":
+                    render_verified_response(msg["content"])
+                else:
+                    st.write(msg["content"])
+    
+    render_citation_panel(chat_history)
+    
+    # Query Bar: text input with the universal mic alongside
+    col_input, col_mic = st.columns([14, 1], vertical_alignment="bottom")
+    with col_input:
         input_text = st.chat_input("Enter Legal Query or Strategy Request...")
-        
-        # 2. Render Universal Mic in the Absolute Positioned Container
-        with st.container():
-            st.markdown('<div class="mic-container">', unsafe_allow_html=True)
-            input_voice = speech_to_text(
-                language=lexicon[sys_lang], 
-                start_prompt="🎙️", 
-                stop_prompt="🛑", 
-                key='leviathan_mic', 
-                just_once=True
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        active_query = input_text or input_voice
-        
-        if active_query:
-            db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "user", active_query)
-            with history_canvas:
-                with st.chat_message("user"): st.write(active_query)
+    with col_mic:
+        input_voice = capture_voice_query(sys_lang, INTERFACE_LEXICON[sys_lang])
+    
+    active_query = input_text or input_voice
+    
+    if active_query:
+        db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "user", active_query)
+        with history_canvas:
+            with st.chat_message("user"): st.write(active_query)
             with st.chat_message("assistant"):
                 with st.spinner("Synthesizing Legal Analysis..."):
                     engine = get_analytical_engine()
                     if engine:
-                        prompt = f"Persona: {sys_persona}. Language: {sys_lang}. Query: {active_query}"
-                        ai_response = engine.invoke(prompt).content
-                        st.markdown(ai_response)
+                        messages, _ = build_prompt_messages(sys_persona, sys_lang, active_query, build_statute_blocks(active_query))
+                        ai_response = engine.invoke(messages).content
+                        render_verified_response(ai_response)
                         db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "assistant", ai_response)
-            st.rerun()
+        rerun_fragment()
 
-    elif nav_mode == "Law Library":
-        st.header("📚 Sovereign Law Library")
-        st.subheader("Asset Synchronization Vault")
-        
-        # Physical Sync with the 'data' folder
-        if not os.path.exists("data"):
-            os.makedirs("data")
-        
-        local_files = [f for f in os.listdir("data") if f.endswith('.pdf')]
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric("Total Local Assets", len(local_files))
-        with col2:
-            if st.button("🔄 Force Re-Sync Repository"):
-                st.rerun()
+@leviathan_fragment
+def render_repository_listing():
+    """Law Library block: physical sync listing of the local 'data' repository."""
+    # Physical Sync with the 'data' folder
+    if not os.path.exists("data"):
+        os.makedirs("data")
+    
+    local_files = [f for f in os.listdir("data") if f.endswith('.pdf')]
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Total Local Assets", len(local_files))
+    with col2:
+        if st.button("🔄 Force Re-Sync Repository"):
+            rerun_fragment()
 
-        st.divider()
-        st.markdown("**Available Jurisprudence Assets**")
-
-        if local_files:
-            asset_data = []
-            for file in local_files:
-                file_path = os.path.join("data", file)
-                stats = os.stat(file_path)
-                asset_data.append({
-                    "Filename": file,
-                    "Size (KB)": round(stats.st_size / 1024, 2),
-                    "Last Modified": datetime.datetime.fromtimestamp(stats.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
-                })
-            
-            st.table(asset_data)
-            
-            selected_doc = st.selectbox("Select Document for Analysis", local_files)
-            if st.button("🔍 Initialize Deep Scan"):
-                st.info(f"Analyzing {selected_doc} for legal precedents...")
-        else:
-            st.warning("Vault is empty. No PDF documents found in 'data' directory.")
+    st.divider()
+    st.markdown("**Available Jurisprudence Assets**")
 
-    elif nav_mode == "System Admin":
-        st.header("🛡️ System Administration Console")
-        st.subheader("Architectural Board")
-        architects = [
-            {"Name": "Saim Ahmed", "Designation": "Lead Architect", "Domain": "System Logic"},
-            {"Name": "Huzaifa Khan", "Designation": "AI Lead", "Domain": "LLM Tuning"},
-            {"Name": "Mustafa Khan", "Designation": "DBA", "Domain": "SQL Security"},
-            {"Name": "Ibrahim Sohail", "Designation": "UI Lead", "Domain": "Shaders"},
-            {"Name": "Daniyal Faraz", "Designation": "QA Lead", "Domain": "Integration"}
-        ]
-        st.table(architects)
-# ------------------------------------------------------------------------------# ------------------------------------------------------------------------------
-# SECTION 8: UI LAYOUT - SOVEREIGN CHAMBERS (MAIN WORKSTATION)
-# ------------------------------------------------------------------------------
+    if local_files:
+        asset_data = []
+        for file in local_files:
+            file_path = os.path.join("data", file)
+            stats = os.stat(file_path)
+            asset_data.append({
+                "Filename": file,
+                "Size (KB)": round(stats.st_size / 1024, 2),
+                "Last Modified": datetime.datetime.fromtimestamp(stats.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+            })
+        
+        st.table(asset_data)
+        
+        selected_doc = st.selectbox("Select Document for Analysis", local_files)
+        if st.button("🔍 Initialize Deep Scan"):
+            st.info(f"Analyzing {selected_doc} for legal precedents...")
+    else:
+        st.warning("Vault is empty. No PDF documents found in 'data' directory.")
 
 def render_main_interface():
     """
     Constructs the Primary AI Workstation UI.
-    Includes Sidebar navigation, Case management, Law Library, and the Chat engine.
+    Includes Sidebar navigation, Case management, Law Library (Local Sync), and the Chat engine.
+    Interactive blocks are fragments: only navigation and case switches rerun the full page.
     """
     apply_leviathan_shaders()
-    
-    # Language Context Map
-    lexicon = {
-        "English": "en-US", 
-        "Urdu": "ur-PK", 
-        "Sindhi": "sd-PK", 
-        "Punjabi": "pa-PK"
-    }
 
     # --- SIDEBAR DESIGN ---
     with st.sidebar:
@@ -780,105 +3962,30 @@ def render_main_interface():
         st.divider()
         
         if nav_mode == "Chambers":
-            st.markdown("**Active Case Files**")
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT chamber_name FROM chambers WHERE owner_email=?", (st.session_state.user_email,))
-            user_chambers = [r[0] for r in cursor.fetchall()]
-            conn.close()
-            
-            if not user_chambers:
-                user_chambers = ["General Litigation Chamber"]
-                
-            st.session_state.active_ch = st.radio(
-                "Select Case", 
-                user_chambers, 
-                label_visibility="collapsed"
-            )
-            
-            col_add, col_mail = st.columns(2)
-            with col_add:
-                if st.button("➕ New"): st.session_state.trigger_new_ch = True
-            with col_mail:
-                if st.button("📧 Brief"):
-                    hist = db_fetch_chamber_history(st.session_state.user_email, st.session_state.active_ch)
-                    if dispatch_legal_brief(st.session_state.user_email, st.session_state.active_ch, hist):
-                        st.success("Brief Dispatched")
+            render_chamber_manager()
 
         st.divider()
-        
-        with st.expander("⚙️ Settings & help"):
-            st.caption("AI Configuration")
-            sys_persona = st.text_input("Assistant Persona", value="Senior High Court Advocate")
-            sys_lang = st.selectbox("Interface Language", list(lexicon.keys()))
-            
-            st.divider()
-            if st.button("🚪 Secure Logout", use_container_width=True):
-                st.session_state.logged_in = False
-                st.rerun()
+        render_workspace_settings()
 
     # --- MAIN CONTENT AREA ---
     if nav_mode == "Chambers":
         st.header(f"💼 CASE: {st.session_state.active_ch}")
         st.caption("Strategic Litigation Environment | End-to-End Encryption Verified")
-        
-        history_canvas = st.container()
-        with history_canvas:
-            chat_history = db_fetch_chamber_history(st.session_state.user_email, st.session_state.active_ch)
-            for msg in chat_history:
-                with st.chat_message(msg["role"]):
-                    st.write(msg["content"])
-        
-        # ALIGNED INPUT BAR CSS
-        st.markdown("""
-            <style>
-                .stChatInputContainer { padding-right: 60px !important; }
-                .mic-container { position: fixed; bottom: 38px; right: 4.5%; z-index: 999999; }
-                .mic-container button { background: transparent !important; border: none !important; font-size: 22px !important; box-shadow: none !important; }
-            </style>
-        """, unsafe_allow_html=True)
-
-        input_text = st.chat_input("Enter Legal Query or Strategy Request...")
-        
-        with st.container():
-            st.markdown('<div class="mic-container">', unsafe_allow_html=True)
-            input_voice = speech_to_text(
-                language=lexicon[sys_lang], 
-                start_prompt="🎙️", 
-                stop_prompt="🛑", 
-                key='leviathan_mic', 
-                just_once=True
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        active_query = input_text or input_voice
-        
-        if active_query:
-            db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "user", active_query)
-            with history_canvas:
-                with st.chat_message("user"): st.write(active_query)
-            with st.chat_message("assistant"):
-                with st.spinner("Synthesizing Legal Analysis..."):
-                    engine = get_analytical_engine()
-                    if engine:
-                        prompt = f"Persona: {sys_persona}. Language: {sys_lang}. Query: {active_query}"
-                        ai_response = engine.invoke(prompt).content
-                        st.markdown(ai_response)
-                        db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "assistant", ai_response)
-            st.rerun()
+        render_chat_workspace()
 
     elif nav_mode == "Law Library":
         st.header("📚 Sovereign Law Library")
         st.subheader("Asset Synchronization Vault")
+        render_ingestion_panel()
+        
+        st.divider()
+        render_repository_listing()
         
-        uploaded_files = st.file_uploader("Upload Legal Precedents (PDF)", accept_multiple_files=True, type=['pdf'])
-        if uploaded_files:
-            for f in uploaded_files:
-                st.info(f"File Synced: {f.name} ({f.size//1024} KB)")
+        st.divider()
+        render_document_viewer()
         
         st.divider()
-        st.markdown("**Available Jurisprudence Assets**")
-        st.caption("No synchronized assets detected in local repository.")
+        render_citation_index_panel()
 
     elif nav_mode == "System Admin":
         st.header("🛡️ System Administration Console")
@@ -891,7 +3998,29 @@ def render_main_interface():
             {"Name": "Daniyal Faraz", "Designation": "QA Lead", "Domain": "Integration"}
         ]
         st.table(architects)
-#-------------------------------------------------------------------------------        
+        
+        st.divider()
+        render_storage_tiering_panel()
+        
+        st.divider()
+        render_tenant_shard_panel()
+        
+        st.divider()
+        render_maintenance_panel()
+        
+        st.divider()
+        render_snapshot_panel()
+        
+        st.divider()
+        render_speech_benchmark_panel()
+        
+        st.divider()
+        render_ingestion_benchmark_panel()
+        
+        st.divider()
+        render_ui_timing_panel()
+
+# ------------------------------------------------------------------------------
 # SECTION 9: UI LAYOUT - SOVEREIGN PORTAL (AUTHENTICATION)
 # ------------------------------------------------------------------------------
 
@@ -933,9 +4062,11 @@ def render_sovereign_portal():
             reg_e = st.text_input("Counsel Email", key="reg_e")
             reg_n = st.text_input("Counsel Full Name", key="reg_n")
             reg_p = st.text_input("Vault Key", type="password", key="reg_p")
+            reg_f = st.text_input("Firm ID (optional)", key="reg_f", placeholder="e.g. khan-associates",
+                                  help="Counsel of one firm share a dedicated chamber shard. Leave blank for independent practice.")
             
             if st.button("Initialize Registry", use_container_width=True):
-                if db_create_vault_user(reg_e, reg_n, reg_p):
+                if db_create_vault_user(reg_e, reg_n, reg_p, firm_id=reg_f):
                     st.success("VAULT SYNCED: Account established in advocate_ai_v2.db")
                 else:
                     st.error("REGISTRY FAILED: Email already exists or input is invalid.")
@@ -950,14 +4081,23 @@ if "logged_in" not in st.session_state:
 if "active_ch" not in st.session_state:
     st.session_state.active_ch = "General Litigation Chamber"
 
+# Start Background Database Maintenance (once per server process, SQLite vault only)
+if get_persistence_backend().name == "sqlite":
+    get_maintenance_scheduler()
+
 # Intercept OAuth Callbacks
 handle_google_callback()
 
-# Render UI based on state
-if not st.session_state.logged_in:
-    render_sovereign_portal()
-else:
-    render_main_interface()
+# Render UI based on state (timed as one full-run interaction)
+st.session_state.ui_render_scope = "full run"
+try:
+    if not st.session_state.logged_in:
+        render_sovereign_portal()
+    else:
+        render_main_interface()
+finally:
+    st.session_state.ui_render_scope = None
+    record_ui_timing("full run", RUN_STARTED)
 
 # ==============================================================================
 # END OF ALPHA APEX LEVIATHAN CORE - SYSTEM STABLE
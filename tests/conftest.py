@@ -0,0 +1,70 @@
+"""
+Shared fixtures. app.py is a Streamlit script, so it is imported once in bare mode from a
+scratch working directory; the `backend` fixture then points the persistence layer at a
+fresh SQLite file or PostgreSQL schema per test.
+
+PostgreSQL comes from LEVIATHAN_TEST_POSTGRES_DSN, else an embedded server via `pgserver`;
+the postgres parametrization is skipped when neither is available.
+"""
+import importlib.util
+import os
+import uuid
+
+import pytest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("vault")
+    previous = os.getcwd()
+    os.chdir(workdir)
+    spec = importlib.util.spec_from_file_location("leviathan_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    yield module
+    os.chdir(previous)
+
+
+@pytest.fixture(scope="session")
+def postgres_uri(tmp_path_factory):
+    dsn = os.environ.get("LEVIATHAN_TEST_POSTGRES_DSN")
+    if dsn:
+        yield dsn
+        return
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(str(tmp_path_factory.mktemp("pgdata")), cleanup_mode="stop")
+    yield server.get_uri()
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def backend(request, app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "DB_FILENAME", str(tmp_path / "vault.db"))
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "COLD_DB_FILENAME", str(tmp_path / "vault_cold.db"))
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "SHARD_DIRECTORY", str(tmp_path / "shards"))
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "EXPORT_DIRECTORY", str(tmp_path / "exports"))
+
+    schema = None
+    if request.param == "sqlite":
+        selected = app.SQLiteBackend()
+    else:
+        psycopg = pytest.importorskip("psycopg")
+        uri = request.getfixturevalue("postgres_uri")
+        schema = f"leviathan_{uuid.uuid4().hex[:12]}"
+        with psycopg.connect(uri, autocommit=True) as admin:
+            admin.execute(f"CREATE SCHEMA {schema}")
+        selected = app.PostgresBackend(psycopg.conninfo.make_conninfo(uri, options=f"-c search_path={schema}"))
+
+    monkeypatch.setattr(app, "get_persistence_backend", lambda: selected)
+    app.get_chamber_registry_cache.clear()
+    app.get_tenant_shard_registry.clear()
+    app.init_leviathan_db(selected)
+    yield selected
+
+    app.get_chamber_registry_cache.clear()
+    app.get_tenant_shard_registry.clear()
+    if schema:
+        selected.pool.close()
+        with psycopg.connect(uri, autocommit=True) as admin:
+            admin.execute(f"DROP SCHEMA {schema} CASCADE")
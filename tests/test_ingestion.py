@@ -0,0 +1,16 @@
+"""Upload ingestion: the benchmark drives the real pipeline without touching the live vault."""
+import os
+
+
+def test_benchmark_ingestion_runs_real_pipeline_on_scratch_vault(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "DB_FILENAME", str(tmp_path / "vault.db"))
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "DATA_REPOSITORY", str(tmp_path / "data"))
+
+    result = app.benchmark_ingestion(file_count=12, pages_per_file=2, duplicate_every=4)
+
+    assert result["Queued"] == 10
+    assert result["Duplicates"] == 2
+    assert result["Indexed"] == 10
+    assert result["Pages"] == 20
+    assert not os.path.exists(tmp_path / "vault.db")
+    assert not os.path.exists(tmp_path / "data")
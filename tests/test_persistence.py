@@ -0,0 +1,182 @@
+"""CRUD paths of the persistence layer, run against both SQLite and PostgreSQL."""
+import pytest
+
+CHAMBER = "General Litigation Chamber"
+
+
+def test_schema_init_is_idempotent(app, backend):
+    app.init_leviathan_db(backend)
+    conn = backend.connect()
+    try:
+        columns = backend.table_columns(conn.cursor(), "users")
+    finally:
+        conn.close()
+    assert {"email", "vault_key", "total_queries", "provider", "firm_id"} <= set(columns)
+
+
+def test_vault_registration_and_login(app, backend):
+    assert app.db_create_vault_user("counsel@firm.pk", "Counsel", "key")
+    assert not app.db_create_vault_user("counsel@firm.pk", "Counsel", "key")
+    assert app.db_verify_vault_access("counsel@firm.pk", "key") == "Counsel"
+    assert app.db_verify_vault_access("counsel@firm.pk", "wrong") is None
+    assert app.db_fetch_user_chambers("counsel@firm.pk") == [CHAMBER]
+
+
+def test_chamber_registry_lifecycle(app, backend):
+    email = "counsel@firm.pk"
+    app.db_create_vault_user(email, "Counsel", "key")
+    assert app.db_create_chamber(email, "Rent Appeal", "Rent & Tenancy")
+    assert not app.db_create_chamber(email, "Rent Appeal")
+    assert app.db_rename_chamber(email, "Rent Appeal", "Rent Appeal 2026")
+    assert app.db_fetch_user_chambers(email) == [CHAMBER, "Rent Appeal 2026"]
+
+    assert app.db_set_chamber_archived(email, "Rent Appeal 2026", True)
+    assert app.db_fetch_user_chambers(email) == [CHAMBER]
+    assert app.db_fetch_user_chambers(email, archived=True) == ["Rent Appeal 2026"]
+
+    assert app.db_set_chamber_archived(email, "Rent Appeal 2026", False)
+    assert app.db_fetch_user_chambers(email) == [CHAMBER, "Rent Appeal 2026"]
+
+
+def test_consultation_log_and_history(app, backend):
+    email = "counsel@firm.pk"
+    app.db_create_vault_user(email, "Counsel", "key")
+    app.db_log_consultation(email, CHAMBER, "user", "Is the tenant liable?")
+    app.db_log_consultation(email, CHAMBER, "assistant", "Issue: ...")
+
+    history = app.db_fetch_chamber_history(email, CHAMBER)
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    conn = backend.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT total_queries FROM users WHERE email=?", (email,))
+        assert cursor.fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_chamber_list_reflects_other_replicas_on_postgres(app, backend):
+    email = "counsel@firm.pk"
+    app.db_create_vault_user(email, "Counsel", "key")
+    assert app.db_fetch_user_chambers(email) == [CHAMBER]
+
+    # Another writer (a second replica on PostgreSQL) provisions a chamber behind this process
+    conn = backend.connect()
+    try:
+        conn.cursor().execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)",
+                              (email, "Filed Elsewhere", "2026-01-01 00:00:00"))
+        conn.commit()
+    finally:
+        conn.close()
+
+    expected = [CHAMBER, "Filed Elsewhere"] if backend.name == "postgres" else [CHAMBER]
+    assert app.db_fetch_user_chambers(email) == expected
+
+
+def test_archive_tiering_keeps_transcripts_readable(app, backend):
+    email = "counsel@firm.pk"
+    app.db_create_vault_user(email, "Counsel", "key")
+    for i in range(5):
+        app.db_log_consultation(email, CHAMBER, "user", f"query {i}")
+    app.db_create_chamber(email, "Open Matter")
+    app.db_set_chamber_archived(email, CHAMBER, True)
+
+    report = app.db_tier_archived_chambers()
+    assert report["messages"] == (5 if backend.name == "sqlite" else 0)
+    assert [m["content"] for m in app.db_fetch_chamber_history(email, CHAMBER)] == [f"query {i}" for i in range(5)]
+
+    app.db_set_chamber_archived(email, CHAMBER, False)
+    assert len(app.db_fetch_chamber_history(email, CHAMBER)) == 5
+
+
+def test_chamber_cache_drops_a_read_that_raced_a_write(app, backend, monkeypatch):
+    email = "counsel@firm.pk"
+    app.db_create_vault_user(email, "Counsel", "key")
+    real_connection = app.get_tenant_connection
+
+    class RacingConnection:
+        """Commits a new chamber after the registry SELECTs ran but before the result is cached."""
+        def __init__(self, conn):
+            self._conn = conn
+
+        def __getattr__(self, name):
+            return getattr(self._conn, name)
+
+        def close(self):
+            self._conn.close()
+            monkeypatch.setattr(app, "get_tenant_connection", real_connection)
+            assert app.db_create_chamber(email, "Filed Mid-Read")
+
+    monkeypatch.setattr(app, "get_tenant_connection", lambda e: RacingConnection(real_connection(e)))
+    assert app.db_fetch_user_chambers(email) == [CHAMBER]
+    assert app.db_fetch_user_chambers(email) == [CHAMBER, "Filed Mid-Read"]
+
+
+def test_failed_rehydrate_closes_the_connection_it_opened(app, backend, monkeypatch):
+    email = "counsel@firm.pk"
+    app.db_create_vault_user(email, "Counsel", "key")
+    real_connection = app.get_tenant_connection
+    opened = []
+
+    class TrackedConnection:
+        def __init__(self, conn):
+            self._conn, self.closed = conn, False
+            opened.append(self)
+
+        def __getattr__(self, name):
+            return getattr(self._conn, name)
+
+        def close(self):
+            self.closed = True
+            self._conn.close()
+
+    monkeypatch.setattr(app, "get_tenant_connection", lambda e: TrackedConnection(real_connection(e)))
+    monkeypatch.setattr(app, "get_cold_store_connection", lambda firm_id=None: None)
+
+    assert app.cold_rehydrate_chamber(email, CHAMBER) == 0
+    assert len(opened) == (1 if backend.name == "sqlite" else 0)
+    assert all(conn.closed for conn in opened)
+
+
+def test_firm_consultations_count_queries_in_the_shard_only(app, backend):
+    email = "counsel@alpha.pk"
+    app.db_create_vault_user(email, "Counsel", "key", firm_id="Alpha")
+    app.db_log_consultation(email, CHAMBER, "user", "Is the tenant liable?")
+    app.db_log_consultation(email, CHAMBER, "assistant", "Issue: ...")
+
+    tenant = app.get_tenant_connection(email)
+    directory = backend.connect()
+    try:
+        cursor = tenant.cursor()
+        cursor.execute("SELECT total_queries FROM users WHERE email=?", (email,))
+        assert cursor.fetchone()[0] == 1
+        if backend.name == "sqlite":
+            cursor = directory.cursor()
+            cursor.execute("SELECT total_queries FROM users WHERE email=?", (email,))
+            assert cursor.fetchone()[0] == 0
+    finally:
+        tenant.close()
+        directory.close()
+
+
+def test_cold_stores_and_backups_never_collide_with_another_firm(app, backend, tmp_path, monkeypatch):
+    if backend.name != "sqlite":
+        pytest.skip("cold stores and firm shards are SQLite-only")
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "BACKUP_DIRECTORY", str(tmp_path / "backups"))
+    for email, firm in (("a@acme.pk", "acme"), ("b@acme-cold.pk", "acme-cold")):
+        app.db_create_vault_user(email, "Counsel", "key", firm_id=firm)
+        app.db_log_consultation(email, CHAMBER, "user", f"question from {email}")
+    app.db_set_chamber_archived("a@acme.pk", CHAMBER, True)
+    assert app.db_tier_archived_chambers()["messages"] == 1
+
+    assert app.cold_store_filename("acme") != app.shard_filename("acme-cold")
+    shard = app.get_shard_backend("acme-cold").connect()
+    try:
+        assert shard.execute("SELECT name FROM sqlite_master WHERE name='cold_transcripts'").fetchone() is None
+    finally:
+        shard.close()
+
+    written = app.maintenance_backup().split(", ")
+    assert len(written) == len(set(written))
+    assert any(name.startswith("acme.cold-") for name in written)
+    assert any(name.startswith("acme-cold-") for name in written)
@@ -0,0 +1,124 @@
+"""Bulk snapshot export / import, run against both SQLite and PostgreSQL."""
+import os
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+CHAMBER = "General Litigation Chamber"
+
+
+def _seed_archived_chamber(app, email, messages=5):
+    app.db_create_vault_user(email, "Counsel", "key")
+    for i in range(messages):
+        app.db_log_consultation(email, CHAMBER, "user", f"query {i}")
+    app.db_set_chamber_archived(email, CHAMBER, True)
+    app.db_tier_archived_chambers()
+
+
+def _switch_to_empty_sqlite_vault(app, tmp_path, monkeypatch):
+    """Points the app at a fresh deployment (directory, cold store, shards) to restore into."""
+    restored = tmp_path / "restored"
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "DB_FILENAME", str(restored / "vault.db"))
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "COLD_DB_FILENAME", str(restored / "vault_cold.db"))
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "SHARD_DIRECTORY", str(restored / "shards"))
+    restored.mkdir()
+    target = app.SQLiteBackend()
+    monkeypatch.setattr(app, "get_persistence_backend", lambda: target)
+    app.get_chamber_registry_cache.clear()
+    app.get_tenant_shard_registry.clear()
+    app.init_leviathan_db(target)
+    return restored
+
+
+def test_export_includes_cold_tier_transcripts(app, backend):
+    email = "counsel@firm.pk"
+    _seed_archived_chamber(app, email)
+
+    snapshot_dir, manifest = app.db_export_snapshot()
+
+    bodies = pq.read_table(f"{snapshot_dir}/message_logs.parquet").column("message_body").to_pylist()
+    assert sorted(bodies) == [f"query {i}" for i in range(5)]
+    assert manifest["tables"]["message_logs"]["rows"] == 5
+
+
+def test_reimport_is_idempotent(app, backend):
+    email = "counsel@firm.pk"
+    _seed_archived_chamber(app, email)
+    snapshot_dir, _ = app.db_export_snapshot()
+
+    report = app.import_snapshot(backend, snapshot_dir)
+
+    assert report["users"] == 0
+    assert report["chambers_created"] == 0
+    assert report["telemetry"] == 0
+
+
+def test_export_covers_every_firm_shard_and_import_routes_back(app, backend, tmp_path, monkeypatch):
+    if backend.name != "sqlite":
+        pytest.skip("firm shards are SQLite-only; PostgreSQL keeps every chamber in the directory")
+    counsel = {"a@alpha.pk": "Alpha", "b@beta.pk": "Beta", "solo@bar.pk": None}
+    for email, firm in counsel.items():
+        app.db_create_vault_user(email, "Counsel", "key", firm_id=firm)
+        app.db_log_consultation(email, CHAMBER, "user", f"question from {email}")
+    app.db_set_chamber_archived("a@alpha.pk", CHAMBER, True)
+    app.db_tier_archived_chambers()
+
+    snapshot_dir, manifest = app.db_export_snapshot(include_credentials=True)
+    assert manifest["firms"] == ["alpha", "beta"]
+    assert manifest["tables"]["chambers"]["rows"] == 3
+    assert manifest["tables"]["message_logs"]["rows"] == 3
+    assert pq.read_table(f"{snapshot_dir}/users.parquet").column("total_queries").to_pylist() == [1, 1, 1]
+
+    restored = _switch_to_empty_sqlite_vault(app, tmp_path, monkeypatch)
+    report = app.db_import_snapshot(snapshot_dir)
+
+    assert report["chambers_created"] == 3
+    assert report["messages"] == 3
+    assert sorted(os.listdir(restored / "shards")) == ["alpha.db", "beta.db"]
+    for email, firm in counsel.items():
+        assert app.resolve_tenant_shard(email) == (firm.lower() if firm else None)
+        assert [m["content"] for m in app.db_fetch_chamber_history(email, CHAMBER)] == [f"question from {email}"]
+        tenant = app.get_tenant_connection(email)
+        try:
+            assert tenant.execute("SELECT total_queries FROM users WHERE email=?", (email,)).fetchone()[0] == 1
+        finally:
+            tenant.close()
+
+
+def test_keyless_restore_is_claimed_by_registering_again(app, backend, tmp_path, monkeypatch):
+    if backend.name != "sqlite":
+        pytest.skip("restores into an empty SQLite deployment")
+    app.db_create_vault_user("a@alpha.pk", "Counsel", "old-key", firm_id="Alpha")
+    app.db_log_consultation("a@alpha.pk", CHAMBER, "user", "before the restore")
+    snapshot_dir, _ = app.db_export_snapshot()
+
+    _switch_to_empty_sqlite_vault(app, tmp_path, monkeypatch)
+    app.db_import_snapshot(snapshot_dir)
+
+    assert app.db_verify_vault_access("a@alpha.pk", "old-key") is None
+    assert app.db_create_vault_user("a@alpha.pk", "Counsel", "new-key")
+    assert not app.db_create_vault_user("a@alpha.pk", "Someone Else", "other-key")
+    assert app.db_verify_vault_access("a@alpha.pk", "new-key") == "Counsel"
+    assert app.resolve_tenant_shard("a@alpha.pk") == "alpha"
+    assert app.db_fetch_user_chambers("a@alpha.pk") == [CHAMBER]
+    assert [m["content"] for m in app.db_fetch_chamber_history("a@alpha.pk", CHAMBER)] == ["before the restore"]
+
+
+def test_import_skips_chambers_whose_owner_is_missing(app, backend, tmp_path, monkeypatch):
+    if backend.name != "sqlite":
+        pytest.skip("restores into an empty SQLite deployment")
+    for email in ("kept@bar.pk", "dropped@bar.pk"):
+        app.db_create_vault_user(email, "Counsel", "key")
+        app.db_log_consultation(email, CHAMBER, "user", f"question from {email}")
+    snapshot_dir, _ = app.db_export_snapshot(include_credentials=True)
+    users = pq.read_table(f"{snapshot_dir}/users.parquet")
+    pq.write_table(users.filter(pc.not_equal(users["email"], "dropped@bar.pk")), f"{snapshot_dir}/users.parquet")
+
+    _switch_to_empty_sqlite_vault(app, tmp_path, monkeypatch)
+    report = app.db_import_snapshot(snapshot_dir)
+
+    assert report["chambers_created"] == 1
+    assert report["chambers_orphaned"] == 1
+    assert report["messages"] == 1
+    assert [m["content"] for m in app.db_fetch_chamber_history("kept@bar.pk", CHAMBER)] == ["question from kept@bar.pk"]
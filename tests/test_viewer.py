@@ -0,0 +1,35 @@
+"""Document viewer: shared PDF mappings and download sources."""
+import os
+
+import pytest
+
+
+@pytest.fixture
+def repository(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.SYSTEM_CONFIG, "DATA_REPOSITORY", str(tmp_path))
+    app.get_pdf_mapping_registry.clear()
+    yield tmp_path
+    app.get_pdf_mapping_registry.clear()
+
+
+def test_mappings_of_deleted_or_replaced_files_are_dropped(app, repository):
+    for name in ("kept.pdf", "deleted.pdf", "replaced.pdf"):
+        (repository / name).write_bytes(app._synthetic_judgment_pdf(2, 1))
+        with app.open_mapped_pdf(name) as stream:
+            assert stream.read(5) == b"%PDF-"
+
+    os.remove(repository / "deleted.pdf")
+    replacement = repository / "replaced.pdf.new"
+    replacement.write_bytes(app._synthetic_judgment_pdf(3, 2))
+    os.replace(replacement, repository / "replaced.pdf")
+
+    assert app.prune_pdf_mappings() == 2
+    assert list(app.get_pdf_mapping_registry()["maps"]) == [os.path.realpath(repository / "kept.pdf")]
+
+
+def test_download_source_is_a_file_handle_inside_the_repository(app, repository):
+    (repository / "judgment.pdf").write_bytes(b"%PDF-1.4 body")
+    with app.open_pdf_download("judgment.pdf") as fh:
+        assert fh.read() == b"%PDF-1.4 body"
+    with pytest.raises(ValueError):
+        app.open_pdf_download("../outside.pdf")